@@ -1,10 +1,27 @@
 import logging
+import os
 import sys
 import copy
 import petl as etl
+
+# Make the shared `common` package importable when run as `python NYCH/main.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.records import (
+    AGE_RANGE_INFANTS,
+    AGE_RANGE_1_YEAR,
+    AGE_RANGE_2_YEARS,
+    AGE_RANGE_3_YEARS,
+    AGE_RANGE_4_YEARS,
+    AGE_RANGE_5_YEARS,
+    AGE_RANGE_SCHOOL,
+    row_builder,
+)
+from common.parse_cache import ParseCache
+from common.validation import ValidationStage
 from scrapers import scrape_provider_html
-from parsers import parse_provider_html
-from transformers import transform_record
+from parsers import PARSER_VERSION, parse_provider_html
+from transformers import NYCH_RESULT_FIELDS, build_provider_record
 
 
 def main():
@@ -19,42 +36,19 @@ def main():
         "School Based Child Care",
     ]
 
-    # Mapping age ranges to structured dictionaries for downstream use
-    age_range_map = {
-        "Child Care - Infants/Toddlers": {
-            "AGE_INFANT_MINIMUM": None,
-            "AGE_RANGE_1_YEAR": True,
-            "AGE_RANGE_2_YEARS": False,
-            "AGE_RANGE_3_YEARS": False,
-            "AGE_RANGE_4_YEARS": False,
-            "AGE_RANGE_5_YEARS": False,
-            "AGE_RANGE_INFANTS": True,
-            "AGE_RANGE_SCHOOL": False,
-        },
-        "Child Care - Pre School": {
-            "AGE_INFANT_MINIMUM": None,
-            "AGE_RANGE_1_YEAR": False,
-            "AGE_RANGE_2_YEARS": True,
-            "AGE_RANGE_3_YEARS": True,
-            "AGE_RANGE_4_YEARS": True,
-            "AGE_RANGE_5_YEARS": True,
-            "AGE_RANGE_INFANTS": False,
-            "AGE_RANGE_SCHOOL": False,
-        },
-        "School Based Child Care": {
-            "AGE_INFANT_MINIMUM": None,
-            "AGE_RANGE_1_YEAR": False,
-            "AGE_RANGE_2_YEARS": False,
-            "AGE_RANGE_3_YEARS": False,
-            "AGE_RANGE_4_YEARS": False,
-            "AGE_RANGE_5_YEARS": False,
-            "AGE_RANGE_INFANTS": False,
-            "AGE_RANGE_SCHOOL": True,
-        },
+    # Mapping age ranges to age range bitmasks for downstream use
+    age_mask_map = {
+        "Child Care - Infants/Toddlers": AGE_RANGE_INFANTS | AGE_RANGE_1_YEAR,
+        "Child Care - Pre School": AGE_RANGE_2_YEARS | AGE_RANGE_3_YEARS | AGE_RANGE_4_YEARS | AGE_RANGE_5_YEARS,
+        "School Based Child Care": AGE_RANGE_SCHOOL,
     }
 
     provider_results = []
 
+    # Skip re-parsing search pages that are byte-identical to a previous run
+    parse_cache = ParseCache("NYCH/raw_data/parse_cache.db")
+    parse_providers = parse_cache.wrap(parse_provider_html, PARSER_VERSION)
+
     # Scrape and parse data for each age range
     for age_range in age_ranges:
         result = scrape_provider_html(url, age_range)
@@ -63,17 +57,19 @@ def main():
             continue
 
         # Parse provider data from HTML
-        providers = parse_provider_html(result["raw_html"])
+        providers = parse_providers(result["raw_html"])
 
         # Build a table with additional age range information
         table = (
             etl.fromdicts(providers)
-            .addfield("age_range", age_range_map[age_range])
+            .addfield("age_mask", age_mask_map[age_range])
         )
 
         # Append the parsed table to the results list
         provider_results.append(table)
 
+    parse_cache.close()
+
     # Process and save the results
     if provider_results:
         # Concatenate all provider tables
@@ -89,8 +85,16 @@ def main():
 
         # Transform and save the provider data
         try:
-            transformed_providers = [transform_record(rec) for rec in all_providers.dicts()]
-            etl.fromdicts(transformed_providers).tocsv("NYCH/result_data/NYCH_result_data.csv")
+            validation = ValidationStage("NYCH/result_data/NYCH_rejects.csv", NYCH_RESULT_FIELDS)
+            try:
+                to_row = row_builder(NYCH_RESULT_FIELDS)
+                transformed_providers = [
+                    to_row(record)
+                    for record in validation.process(build_provider_record(rec) for rec in all_providers.dicts())
+                ]
+            finally:
+                validation.close()
+            etl.wrap([NYCH_RESULT_FIELDS, *transformed_providers]).tocsv("NYCH/result_data/NYCH_result_data.csv")
             logging.info("Successfully transformed and saved provider records.")
         except Exception as e:
             logging.error(f"Failed to save transformed provider data to CSV: {e}")
@@ -1,5 +1,9 @@
 import re
 
+# Bump whenever the parser's output changes so cached results are discarded
+PARSER_VERSION = "1"
+
+
 def parse_provider_html(html: str) -> list:
     """
     Parse provider HTML to extract location data embedded in JavaScript objects.
@@ -1,4 +1,31 @@
 import logging
+from common.records import AGE_RANGE_STRINGS, ProviderRecord, age_mask_from_dict
+
+# Column order of NYCH_result_data.csv
+NYCH_RESULT_FIELDS = (
+    "PROGRAM_NAME",
+    "ADDRESS_CITY",
+    "ADDRESS_COUNTRY",
+    "ADDRESS_BOUROUGH",
+    "ADDRESS_COUNTY",
+    "ADDRESS_LATITUDE",
+    "ADDRESS_LONGITUDE",
+    "ADDRESS_STATE",
+    "ADDRESS_STREET",
+    "ADDRESS_ZIPCODE",
+    "AGE_RANGE",
+    "AGE_INFANT_MINIMUM",
+    "AGE_RANGE_1_YEAR",
+    "AGE_RANGE_2_YEARS",
+    "AGE_RANGE_3_YEARS",
+    "AGE_RANGE_4_YEARS",
+    "AGE_RANGE_5_YEARS",
+    "AGE_RANGE_INFANTS",
+    "AGE_RANGE_SCHOOL",
+    "GEN_PHONE_1",
+    "GEN_PROGRAM_SETTING",
+    "GEN_WEBSITE",
+)
 
 def build_availability_string(age_dict: dict) -> str:
     """
@@ -10,21 +37,7 @@ def build_availability_string(age_dict: dict) -> str:
     Returns:
         str: A formatted string listing available age ranges, separated by '|~|'.
     """
-    age_brackets = [
-        ("AGE_RANGE_INFANTS", "0-12 Months (Infant)"),
-        ("AGE_RANGE_1_YEAR", "1 year"),
-        ("AGE_RANGE_2_YEARS", "2 years"),
-        ("AGE_RANGE_3_YEARS", "3 years"),
-        ("AGE_RANGE_4_YEARS", "4 years"),
-        ("AGE_RANGE_5_YEARS", "5 years"),
-        ("AGE_RANGE_SCHOOL", "School-age"),
-    ]
-
-    # Build a list of age ranges that are available
-    result = [label for key, label in age_brackets if age_dict.get(key, False)]
-
-    # Join the list with the '|~|' separator
-    return "|~|".join(result)
+    return AGE_RANGE_STRINGS[age_mask_from_dict(age_dict)]
 
 
 def normalize_program_type(program_type: str) -> str:
@@ -66,31 +79,44 @@ def transform_record(record: dict) -> dict:
     Transform a raw record into a structured format for CSV export.
 
     Args:
-        record (dict): The input record with raw data.
+        record (dict): The input record with raw data. Age ranges are read from 'age_mask',
+            or from a legacy 'age_range' dict if it is missing.
 
     Returns:
         dict: A transformed record matching the desired structure.
     """
-    # Build the age range string using the age range dictionary
-    age_range_str = build_availability_string(record.get("age_range", {}))
-
-    # Transform the record into the desired schema
-    transformed = {
-        "PROGRAM_NAME": record.get("centerName", ""),  # Default to empty string if missing
-        "ADDRESS_CITY": "New York",  # Hardcoded as it's specific to NYC
-        "ADDRESS_COUNTRY": "United States",  # Hardcoded
-        "ADDRESS_BOUROUGH": None,  # Placeholder for potential data
-        "ADDRESS_COUNTY": "",  # Default to empty string
-        "ADDRESS_LATITUDE": validate_float(record.get("lat", "")),
-        "ADDRESS_LONGITUDE": validate_float(record.get("lon", "")),
-        "ADDRESS_STATE": "New York",  # Hardcoded
-        "ADDRESS_STREET": record.get("address", ""),
-        "ADDRESS_ZIPCODE": record.get("zipCode", ""),
-        "AGE_RANGE": age_range_str,
-        **record.get("age_range", {}),  # Unpack age range values into the record
-        "GEN_PHONE_1": record.get("phone", ""),
-        "GEN_PROGRAM_SETTING": normalize_program_type(record.get("programType")),
-        "GEN_WEBSITE": None,  # Placeholder for website data
-    }
-
-    return transformed
+    return build_provider_record(record).to_dict(NYCH_RESULT_FIELDS)
+
+
+def build_provider_record(record: dict) -> ProviderRecord:
+    """
+    Build a ProviderRecord from a raw provider record.
+
+    Args:
+        record (dict): The input record with raw data.
+
+    Returns:
+        ProviderRecord: The provider in the result data model.
+    """
+    # Records from before the age bitmask carry a 'age_range' dict instead of 'age_mask'
+    if "age_mask" in record:
+        age_mask, age_infant_minimum = record["age_mask"], None
+    else:
+        age_dict = record.get("age_range") or {}
+        age_mask, age_infant_minimum = age_mask_from_dict(age_dict), age_dict.get("AGE_INFANT_MINIMUM")
+
+    return ProviderRecord(
+        program_name=record.get("centerName", ""),  # Default to empty string if missing
+        address_city="New York",  # Hardcoded as it's specific to NYC
+        address_borough=None,  # Placeholder for potential data
+        address_county="",  # Default to empty string
+        latitude=validate_float(record.get("lat", "")),
+        longitude=validate_float(record.get("lon", "")),
+        address_street=record.get("address", ""),
+        address_zipcode=record.get("zipCode", ""),
+        age_mask=age_mask,
+        age_infant_minimum=age_infant_minimum,
+        phone=record.get("phone", ""),
+        program_setting=normalize_program_type(record.get("programType")),
+        website=None,  # Placeholder for website data
+    )
@@ -0,0 +1,212 @@
+import csv
+import logging
+import os
+import re
+import sqlite3
+from common.validation import load_zip_to_county
+
+# Street suffix and direction abbreviations, normalized to their full USPS names
+STREET_ABBREVIATIONS = {
+    "ST": "STREET",
+    "STR": "STREET",
+    "AVE": "AVENUE",
+    "AV": "AVENUE",
+    "BLVD": "BOULEVARD",
+    "RD": "ROAD",
+    "PL": "PLACE",
+    "PKWY": "PARKWAY",
+    "DR": "DRIVE",
+    "LN": "LANE",
+    "CT": "COURT",
+    "TER": "TERRACE",
+    "HWY": "HIGHWAY",
+    "SQ": "SQUARE",
+    "EXPY": "EXPRESSWAY",
+    "TPKE": "TURNPIKE",
+    "N": "NORTH",
+    "S": "SOUTH",
+    "E": "EAST",
+    "W": "WEST",
+}
+
+HOUSE_NUMBER_PATTERN = re.compile(r"^(\d+(?:-\d+)?[A-Z]?)\s+(.+)$")
+UNIT_PATTERN = re.compile(r"\s+(?:APT|UNIT|SUITE|STE|FL|FLOOR|RM|ROOM|#)\b.*$|\s*#.*$")
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\s*$")
+ORDINAL_PATTERN = re.compile(r"^(\d+)(?:ST|ND|RD|TH)$")
+
+# Bump whenever normalize_street_address changes so stored keys are rebuilt
+NORMALIZATION_VERSION = 2
+
+
+def normalize_street_address(street: str) -> str:
+    """
+    Normalize a street address line (house number and street) for index lookups.
+
+    Args:
+        street (str): A street address line such as '123 W. 45th St, Apt 2'.
+
+    Returns:
+        str: The normalized line (e.g. '123 WEST 45 STREET'), or None if it has no house number.
+    """
+    street = street.upper().split(",")[0]
+    street = UNIT_PATTERN.sub("", street)
+    street = re.sub(r"[^\w\s#-]", " ", street)
+    # Numbered streets are written both as '45TH' and '45', so drop the ordinal suffix
+    street = " ".join(
+        STREET_ABBREVIATIONS.get(word, ORDINAL_PATTERN.sub(r"\1", word)) for word in street.split()
+    )
+
+    match = HOUSE_NUMBER_PATTERN.match(street)
+    if not match:
+        return None
+    return f"{match.group(1)} {match.group(2)}"
+
+
+def address_key(street: str, zip_code: str) -> str:
+    """
+    Build the index key for a street address line and zip code.
+
+    Args:
+        street (str): The street address line.
+        zip_code (str): The 5-digit zip code.
+
+    Returns:
+        str: The lookup key, or None if the street has no house number.
+    """
+    normalized = normalize_street_address(street)
+    if not normalized or not zip_code:
+        return None
+    return f"{normalized}|{zip_code[:5]}"
+
+
+class Geocoder:
+    """
+    An offline geocoder for NYC street addresses.
+
+    Addresses are matched exactly (after normalization) against a local index of
+    address points, which is loaded once from a CSV with the columns
+    house_number, street, zipcode, latitude and longitude (e.g. an export of NYC
+    Address Points). Only exact house number, street and NYC zip matches count as
+    confident. Every lookup, hit or miss, is kept in a persistent cache.
+    """
+
+    def __init__(self, db_path: str, zip_to_county: dict = None):
+        """
+        Open (and create if needed) the geocoder database.
+
+        Args:
+            db_path (str): Path to the SQLite database holding the index and cache.
+            zip_to_county (dict): The NYC zip code to county mapping; loaded from disk if omitted.
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.zip_to_county = zip_to_county if zip_to_county is not None else load_zip_to_county()
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS address_points (
+                address_key TEXT PRIMARY KEY,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                address TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < NORMALIZATION_VERSION:
+            self._rebuild_keys()
+
+    def _rebuild_keys(self):
+        # Keys are normalized streets, so they can be re-normalized in place; cached
+        # lookups were made with the old keys and are dropped
+        rows = self.conn.execute("SELECT address_key, latitude, longitude FROM address_points").fetchall()
+        with self.conn:
+            self.conn.execute("DELETE FROM address_points")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO address_points VALUES (?, ?, ?)",
+                (
+                    (address_key(*key.rsplit("|", 1)) or key, latitude, longitude)
+                    for key, latitude, longitude in rows
+                ),
+            )
+            self.conn.execute("DELETE FROM geocode_cache")
+            self.conn.execute(f"PRAGMA user_version = {NORMALIZATION_VERSION}")
+
+    def load_address_points(self, csv_path: str) -> int:
+        """
+        Replace the address point index with the contents of a CSV file.
+
+        Args:
+            csv_path (str): Path to a CSV with house_number, street, zipcode, latitude and longitude columns.
+
+        Returns:
+            int: The number of address points indexed.
+        """
+        def rows():
+            with open(csv_path, "r", newline="", encoding="utf-8") as csv_file:
+                for row in csv.DictReader(csv_file):
+                    key = address_key(f"{row['house_number']} {row['street']}", row["zipcode"])
+                    if key:
+                        yield key, float(row["latitude"]), float(row["longitude"])
+
+        with self.conn:
+            self.conn.execute("DELETE FROM address_points")
+            self.conn.executemany("INSERT OR REPLACE INTO address_points VALUES (?, ?, ?)", rows())
+            # Cached misses may now resolve, and cached hits may have moved
+            self.conn.execute("DELETE FROM geocode_cache")
+
+        count = self.conn.execute("SELECT COUNT(*) FROM address_points").fetchone()[0]
+        logging.info(f"Indexed {count} address points from '{csv_path}'.")
+        return count
+
+    def geocode(self, address: str) -> tuple:
+        """
+        Geocode a full site address such as '123 Main St, Bronx, NY 10451'.
+
+        Args:
+            address (str): The address as parsed by parse_site_address.
+
+        Returns:
+            tuple: (latitude, longitude) for a confident match, otherwise None.
+        """
+        if not address:
+            return None
+
+        cached = self.conn.execute(
+            "SELECT latitude, longitude FROM geocode_cache WHERE address = ?", (address,)
+        ).fetchone()
+        if cached:
+            return cached if cached[0] is not None else None
+
+        result = None
+        zip_match = ZIP_PATTERN.search(address)
+        if zip_match and zip_match.group(1) in self.zip_to_county:
+            key = address_key(address, zip_match.group(1))
+            if key:
+                result = self.conn.execute(
+                    "SELECT latitude, longitude FROM address_points WHERE address_key = ?", (key,)
+                ).fetchone()
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?)",
+                (address, *(result or (None, None))),
+            )
+        return result
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
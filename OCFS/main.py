@@ -1,18 +1,27 @@
-from scrapers import scrape_provider_ids, scrape_html_from_url
-from parsers import (
-    parse_profile_html,
-    parse_program_name,
-    parse_site_address,
-    parse_total_capacity,
-    parse_location_html,
-    parse_availability,
-)
-from transformers import build_profile_records, build_availability_string, transform_record
+import argparse
+import csv
 import logging
+import multiprocessing
 import os
+import sys
 import json
+import socket
+import sqlite3
+import time
 import petl as etl
 
+# Make the shared `common` package importable when run as `python OCFS/main.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.parse_cache import ParseCache
+from common.records import row_builder
+from common.validation import ValidationStage
+from transformers import OCFS_RESULT_FIELDS, build_provider_record, iter_profile_records
+
+
+PARSE_CACHE_PATH = "OCFS/raw_data/parse_cache.db"
+GEOCODER_DB_PATH = "OCFS/raw_data/geocoder.db"
+
 
 # Configure logging for the application
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -31,10 +40,19 @@ def save_to_json(file_path: str, data: dict):
         json.dump(data, json_file, indent=4)
 
 
-def main():
+def discover_stage(backend: str = "http"):
     """
-    Main function to orchestrate the scraping, parsing, and transforming of OCFS data.
+    Discover provider IDs for every configured county and program type.
+
+    Selenium is only imported here and in the crawl stage, so the transform stage
+    can run without it.
+
+    Args:
+        backend (str): 'http' to replay the search form over HTTP with a Selenium
+            fallback, or 'selenium' to always drive the browser.
     """
+    from scrapers import discover_provider_ids
+
     # Configure the counties and program types to scrape
     counties = ["Manhattan", "Bronx", "Brooklyn", "Queens", "Staten Island"]
     program_types = ["Family Day Care", "Group Family Day Care", "School-Age Child Care"]
@@ -43,68 +61,367 @@ def main():
     for county in counties:
         for program_type in program_types:
             logging.info(f"Scraping data for {county}, {program_type}...")
-            scrape_provider_ids(county, program_type)
+            discover_provider_ids(county, program_type, backend=backend)
+
+
+def cached_parsers(parse_cache: ParseCache) -> dict:
+    """
+    Wrap the profile and location page parsers with the parse cache.
+
+    Each page is hashed and looked up once, and a miss builds a single tree for
+    all of the page's fields.
+
+    Args:
+        parse_cache (ParseCache): The open parse cache.
+
+    Returns:
+        dict: Cached parser functions keyed by parser name.
+    """
+    import parsers
+
+    names = ["parse_profile_page", "parse_location_html"]
+    parse_cache.retain(names)
+    return {name: parse_cache.wrap(getattr(parsers, name), parsers.PARSER_VERSION) for name in names}
+
+
+def scrape_provider(provider_id: str, parse: dict, geocoder=None):
+    """
+    Scrape the profile and location pages for one provider into raw_data/.
+
+    If the geocoder confidently resolves the profile's site address, the Map page
+    is not fetched and the location is saved from the geocode instead.
+
+    Args:
+        provider_id (str): The OCFS provider ID.
+        parse (dict): Parser functions keyed by name, as returned by cached_parsers.
+        geocoder (Geocoder): Optional offline geocoder used to skip the Map page.
+
+    Raises:
+        RuntimeError: If the profile page could not be fetched.
+    """
+    from scrapers import scrape_html_from_url
 
-    # Load provider IDs from CSV
-    provider_ids = list(etl.fromcsv("OCFS/raw_data/provider_ids.csv").values("provider_id"))
-    total_ids = len(provider_ids)
+    # Scrape profile data
+    profile_url = f"https://hs.ocfs.ny.gov/DCFS/Profile/Index/{provider_id}"
+    profile_html = scrape_html_from_url(profile_url)
+    if not profile_html:
+        raise RuntimeError(f"Failed to fetch profile page {profile_url}")
 
-    logging.info(f"Starting scraping process for {total_ids} provider IDs.")
-    for index, provider_id in enumerate(provider_ids, start=1):  # Limiting to first 5 IDs for testing
+    profile_data = parse["parse_profile_page"](profile_html)
+    profile_data["raw_html"] = profile_html
+    save_to_json(f"OCFS/raw_data/profiles/profile_{provider_id}.json", profile_data)
+    logging.info(f"Saved profile data for provider ID {provider_id}.")
+
+    # Use a confident offline geocode in place of the Map page when possible
+    coordinates = geocoder.geocode(profile_data["address"]) if geocoder else None
+    if coordinates:
+        location_data = {
+            "latitude": coordinates[0],
+            "longitude": coordinates[1],
+            "address": profile_data["address"],
+            "source": "geocoder",
+        }
+        save_to_json(f"OCFS/raw_data/locations/location_{provider_id}.json", location_data)
+        logging.info(f"Geocoded location for provider ID {provider_id}; skipped Map page.")
+        return
+
+    # Scrape location data
+    location_url = f"https://hs.ocfs.ny.gov/DCFS/Map/Index/{provider_id}"
+    location_html = scrape_html_from_url(location_url)
+    if location_html:
+        location_data = parse["parse_location_html"](location_html)
+        if location_data:
+            location_data["raw_html"] = location_html
+            save_to_json(f"OCFS/raw_data/locations/location_{provider_id}.json", location_data)
+            logging.info(f"Saved location data for provider ID {provider_id}.")
+
+
+def reparse_record(record: dict, parse: dict) -> dict:
+    """
+    Refresh a stored profile record's parsed fields from its raw HTML.
+
+    Args:
+        record (dict): A combined profile record from build_profile_records.
+        parse (dict): Parser functions keyed by name, as returned by cached_parsers.
+
+    Returns:
+        dict: The same record, updated in place. Fields of a page that fails to parse are left as stored.
+    """
+    # A page that no longer parses keeps the fields stored when it was scraped
+    if record.get("raw_html"):
+        try:
+            record.update(parse["parse_profile_page"](record["raw_html"]))
+        except Exception as e:
+            logging.error(f"Failed to re-parse profile for provider ID {record.get('record_id')}: {e}")
+
+    location_data = record.get("location_data")
+    if location_data and location_data.get("raw_html"):
         try:
-            logging.info(f"Scraping profile for provider ID {provider_id} ({index}/{total_ids})")
-
-            # Scrape profile data
-            profile_url = f"https://hs.ocfs.ny.gov/DCFS/Profile/Index/{provider_id}"
-            profile_html = scrape_html_from_url(profile_url)
-            if profile_html:
-                profile_data = parse_profile_html(profile_html)
-                profile_data["program_name"] = parse_program_name(profile_html)
-                profile_data["address"] = parse_site_address(profile_html)
-                profile_data["total_capacity"] = parse_total_capacity(profile_html)
-                profile_data["raw_html"] = profile_html
-                save_to_json(f"OCFS/raw_data/profiles/profile_{provider_id}.json", profile_data)
-                logging.info(f"Saved profile data for provider ID {provider_id}.")
-
-            # Scrape location data
-            location_url = f"https://hs.ocfs.ny.gov/DCFS/Map/Index/{provider_id}"
-            location_html = scrape_html_from_url(location_url)
-            if location_html:
-                location_data = parse_location_html(location_html)
-                if location_data:
-                    location_data["raw_html"] = location_html
-                    save_to_json(f"OCFS/raw_data/locations/location_{provider_id}.json", location_data)
-                    logging.info(f"Saved location data for provider ID {provider_id}.")
+            location_data.update(parse["parse_location_html"](location_data["raw_html"]) or {})
         except Exception as e:
-            logging.error(f"An error occurred for provider ID {provider_id}: {e}")
+            logging.error(f"Failed to re-parse location for provider ID {record.get('record_id')}: {e}")
+
+    return record
+
+
+def crawl_worker(queue_path: str, batch_size: int, lease_timeout: float, poll_interval: float = 30):
+    """
+    Lease provider IDs from the work queue and scrape them until the queue is drained.
+
+    Any number of worker processes on the machine holding the queue database can
+    run this concurrently.
+
+    Args:
+        queue_path (str): Path to the SQLite work queue.
+        batch_size (int): Number of IDs to lease at a time.
+        lease_timeout (float): Seconds before an unresolved lease is handed to another worker.
+        poll_interval (float): Seconds to wait for other workers' leases when nothing is pending.
+    """
+    from work_queue import WorkQueue
+    from geocoder import Geocoder
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path, visibility_timeout=lease_timeout)
+    parse_cache = ParseCache(PARSE_CACHE_PATH)
+    parse = cached_parsers(parse_cache)
+    geocoder = Geocoder(GEOCODER_DB_PATH)
+    logging.info(f"Worker {worker_id} started.")
+
+    try:
+        while True:
+            provider_ids = queue.lease(worker_id, batch_size)
+            if not provider_ids:
+                if queue.is_drained():
+                    break
+                # Other workers still hold leases; wait in case one of them dies
+                time.sleep(poll_interval)
+                continue
+
+            for provider_id in provider_ids:
+                # Renew the lease before each ID so a slow batch is not re-leased mid-way
+                if not queue.extend(provider_id, worker_id):
+                    continue
+                try:
+                    logging.info(f"Worker {worker_id} scraping provider ID {provider_id}")
+                    scrape_provider(provider_id, parse, geocoder)
+                    queue.complete(provider_id, worker_id)
+                except Exception as e:
+                    logging.error(f"An error occurred for provider ID {provider_id}: {e}")
+                    queue.fail(provider_id, worker_id, str(e))
+    finally:
+        logging.info(f"Worker {worker_id} finished. Queue status: {queue.counts()}")
+        queue.close()
+        parse_cache.close()
+        geocoder.close()
+
+
+def crawl_stage(queue_path: str, workers: int, batch_size: int, lease_timeout: float):
+    """
+    Run one or more crawl workers against the work queue and wait for them to finish.
 
-    # Build profile records from scraped profiles and locations
-    profiles_from_files = build_profile_records(
+    Args:
+        queue_path (str): Path to the SQLite work queue.
+        workers (int): Number of worker processes to start on this machine.
+        batch_size (int): Number of IDs each worker leases at a time.
+        lease_timeout (float): Seconds before an unresolved lease is handed to another worker.
+    """
+    if workers <= 1:
+        crawl_worker(queue_path, batch_size, lease_timeout)
+        return
+
+    processes = [
+        multiprocessing.Process(target=crawl_worker, args=(queue_path, batch_size, lease_timeout))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def seed_queue(queue_path: str, fresh: bool = False, retry_failed: bool = False):
+    """
+    Load discovered provider IDs from provider_ids.csv into the work queue.
+
+    Args:
+        queue_path (str): Path to the SQLite work queue.
+        fresh (bool): Clear the queue first so every provider is scraped again.
+        retry_failed (bool): Requeue IDs that were parked as failed, with their attempts reset.
+    """
+    from work_queue import WorkQueue
+
+    queue = WorkQueue(queue_path)
+    try:
+        if fresh:
+            queue.reset()
+        if retry_failed:
+            logging.info(f"Requeued {queue.retry_failed()} failed provider IDs.")
+        provider_ids = etl.fromcsv("OCFS/raw_data/provider_ids.csv").values("provider_id")
+        added = queue.enqueue(provider_ids)
+        logging.info(f"Queued {added} new provider IDs. Queue status: {queue.counts()}")
+    finally:
+        queue.close()
+
+
+def load_county_index(csv_path: str) -> sqlite3.Connection:
+    """
+    Index the county of each provider ID from provider_ids.csv in a temporary on-disk database.
+
+    Args:
+        csv_path (str): Path to provider_ids.csv.
+
+    Returns:
+        sqlite3.Connection: A database with a `counties (provider_id, county)` table. It is
+            deleted when the connection is closed.
+    """
+    # An empty filename gives a private temporary database that spills to disk instead of memory
+    conn = sqlite3.connect("")
+    conn.execute("CREATE TABLE counties (provider_id TEXT PRIMARY KEY, county TEXT)")
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO counties (provider_id, county) VALUES (?, ?)",
+            etl.fromcsv(csv_path).cut("provider_id", "county").data(),
+        )
+    return conn
+
+
+def stream_profile_records(parse: dict, county_index: sqlite3.Connection):
+    """
+    Stream combined profile records from raw_data/, ready for build_provider_record.
+
+    Each record's parsed fields are refreshed from its raw HTML and the HTML is
+    dropped immediately, so only one provider's pages are in memory at a time.
+
+    Args:
+        parse (dict): Parser functions keyed by name, as returned by cached_parsers.
+        county_index (sqlite3.Connection): The county index, as returned by load_county_index.
+
+    Yields:
+        dict: One profile record with lat, long, age_mask and county_info added.
+    """
+    from parsers import parse_availability_mask
+
+    for record in iter_profile_records(
         profiles_folder="OCFS/raw_data/profiles/", locations_folder="OCFS/raw_data/locations/"
-    )
+    ):
+        reparse_record(record, parse)
 
-    # Load additional county data from provider IDs CSV
-    county_data = {r["provider_id"]: r for r in etl.fromcsv("OCFS/raw_data/provider_ids.csv").dicts()}
-
-    # Process raw profiles
-    raw_profiles = (
-        etl.fromdicts(profiles_from_files)
-        .addfield("lat", lambda rec: rec["location_data"].get("latitude", "") if rec.get("location_data") else "")
-        .addfield("long", lambda rec: rec["location_data"].get("longitude", "") if rec.get("location_data") else "")
-        .addfield("age_ranges", lambda rec: parse_availability(rec["total_capacity"]))
-        .addfield("age_range_string", lambda rec: build_availability_string(rec["age_ranges"]))
-        .addfield("county_info", lambda rec: county_data.get(rec["record_id"], ""))
-        .cutout("raw_html", "location_data")  # Remove unnecessary fields
-    )
+        # Remove unnecessary fields
+        record.pop("raw_html", None)
+        location_data = record.pop("location_data", None) or {}
 
-    # Transform raw profiles to match the desired structure and save to CSV
-    transformed_records = (
-        etl.fromdicts([transform_record(r) for r in raw_profiles.dicts()])
-        .tocsv("OCFS/result_data/OCFS_result_data.csv")
-    )
+        record["lat"] = location_data.get("latitude", "")
+        record["long"] = location_data.get("longitude", "")
+        record["age_mask"] = parse_availability_mask(record.get("total_capacity"))
+        row = county_index.execute(
+            "SELECT county FROM counties WHERE provider_id = ?", (record["record_id"],)
+        ).fetchone()
+        record["county_info"] = {"county": row[0]} if row else {}
+        yield record
+
+
+def transform_stage():
+    """
+    Build OCFS_result_data.csv from the profiles and locations already in raw_data/.
+
+    Providers are streamed one at a time from disk through parsing, transformation
+    and validation to the CSV writer, and each provider's county is looked up in an
+    on-disk index, so memory stays flat as the number of providers grows. Parsed fields are refreshed from each stored page's raw HTML
+    through the parse cache, so only pages that changed since the last run (or
+    since a parser version bump) are actually parsed.
+    """
+    # Counties are looked up per provider from disk rather than held in a dict of every provider ID
+    county_index = load_county_index("OCFS/raw_data/provider_ids.csv")
+
+    # The transform runs in a single process, so cache writes can be batched
+    parse_cache = ParseCache(PARSE_CACHE_PATH, commit_every=500)
+    parse = cached_parsers(parse_cache)
+    validation = ValidationStage("OCFS/result_data/OCFS_rejects.csv", OCFS_RESULT_FIELDS, batch_size=500)
+
+    # Write to a temporary file next to the result CSV so a failed run leaves the previous result intact
+    result_path = "OCFS/result_data/OCFS_result_data.csv"
+    # Opened with "x" rather than tempfile.mkstemp so the result keeps the usual umask permissions
+    temp_path = f"{result_path}.{os.getpid()}.tmp"
+
+    # Transform raw profiles to match the desired structure, validate, and save to CSV
+    try:
+        with open(temp_path, "x", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(OCFS_RESULT_FIELDS)
+            to_row = row_builder(OCFS_RESULT_FIELDS)
+            records = stream_profile_records(parse, county_index)
+            writer.writerows(map(to_row, validation.process(build_provider_record(r) for r in records)))
+        os.replace(temp_path, result_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        validation.close()
+        parse_cache.close()
+        county_index.close()
 
     logging.info("Data transformation and export completed successfully.")
 
 
+def main():
+    """
+    Main function to orchestrate the scraping, parsing, and transforming of OCFS data.
+    """
+    parser = argparse.ArgumentParser(description="Scrape and transform OCFS child care provider data.")
+    parser.add_argument(
+        "--transform-only",
+        action="store_true",
+        help="Skip scraping and rebuild the result CSV from the existing OCFS/raw_data/ files.",
+    )
+    parser.add_argument(
+        "--worker-only",
+        action="store_true",
+        help="Join an existing crawl on this machine: lease IDs from the queue without discovery or transform.",
+    )
+    parser.add_argument(
+        "--discovery",
+        choices=["http", "selenium"],
+        default="http",
+        help="Provider ID discovery backend. 'http' falls back to Selenium on failure.",
+    )
+    parser.add_argument(
+        "--address-points",
+        help="CSV of address points (house_number, street, zipcode, latitude, longitude) to load "
+        "into the offline geocoder before crawling.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Number of crawl worker processes to run.")
+    parser.add_argument("--queue-path", default="OCFS/raw_data/work_queue.db", help="Path to the work queue database.")
+    parser.add_argument("--batch-size", type=int, default=10, help="Provider IDs leased per worker request.")
+    parser.add_argument("--lease-timeout", type=float, default=600, help="Seconds before an unfinished lease expires.")
+    parser.add_argument("--fresh", action="store_true", help="Clear the work queue so every provider is scraped again.")
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Requeue only the provider IDs that failed in earlier runs.",
+    )
+    args = parser.parse_args()
+
+    if args.address_points:
+        from geocoder import Geocoder
+
+        geocoder = Geocoder(GEOCODER_DB_PATH)
+        geocoder.load_address_points(args.address_points)
+        geocoder.close()
+
+    if args.worker_only:
+        crawl_stage(args.queue_path, args.workers, args.batch_size, args.lease_timeout)
+        return
+
+    if args.transform_only:
+        logging.info("Transform-only mode: reprocessing existing raw data.")
+    else:
+        discover_stage(args.discovery)
+        seed_queue(args.queue_path, fresh=args.fresh, retry_failed=args.retry_failed)
+        crawl_stage(args.queue_path, args.workers, args.batch_size, args.lease_timeout)
+
+    transform_stage()
+
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,35 @@
 import logging
-from bs4 import BeautifulSoup
 import re
+from common.records import (
+    AGE_RANGE_ALL,
+    AGE_RANGE_3_YEARS,
+    AGE_RANGE_4_YEARS,
+    AGE_RANGE_5_YEARS,
+    AGE_RANGE_INFANTS,
+    AGE_RANGE_SCHOOL,
+    age_dict_from_mask,
+)
+
+# Bump whenever a parser's output changes so cached results are discarded
+PARSER_VERSION = "1"
+
+
+def make_soup(html: str):
+    """
+    Build a BeautifulSoup tree for the given HTML.
+
+    bs4 is imported on first use so that modules importing these parsers
+    (e.g. for parse_availability) start without loading it.
+
+    Args:
+        html (str): The HTML content as a string.
+
+    Returns:
+        BeautifulSoup: The parsed document.
+    """
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'html.parser')
 
 
 def parse_profile_html(html: str) -> dict:
@@ -13,7 +42,19 @@ def parse_profile_html(html: str) -> dict:
     Returns:
         dict: A dictionary containing the extracted profile data.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    return profile_fields(make_soup(html))
+
+
+def profile_fields(soup) -> dict:
+    """
+    Extract the bold-labelled key-value pairs from a parsed profile page.
+
+    Args:
+        soup (BeautifulSoup): The parsed profile page.
+
+    Returns:
+        dict: A dictionary containing the extracted profile data.
+    """
     data = {}
 
     # Find all <td> elements and process their <b> children
@@ -39,7 +80,7 @@ def parse_location_html(html: str) -> dict:
     Returns:
         dict: A dictionary containing 'latitude', 'longitude', and 'address' if found, otherwise None.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html)
     result = {}
 
     # Extract latitude and longitude from JavaScript variables
@@ -73,8 +114,19 @@ def parse_site_address(html: str) -> str:
     Returns:
         str: The extracted site address, or None if not found.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    return find_site_address(make_soup(html))
+
+
+def find_site_address(soup) -> str:
+    """
+    Find the site address in a parsed profile page.
 
+    Args:
+        soup (BeautifulSoup): The parsed profile page.
+
+    Returns:
+        str: The site address, or None if not found.
+    """
     # Find the "Site Address" span and extract the text
     address_span = soup.find('span', text=lambda t: t and 'Site Address:' in t)
     if address_span:
@@ -94,8 +146,19 @@ def parse_total_capacity(html: str) -> str:
     Returns:
         str: The extracted total capacity, or None if not found.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    return find_total_capacity(make_soup(html))
+
+
+def find_total_capacity(soup) -> str:
+    """
+    Find the total capacity in a parsed profile page.
+
+    Args:
+        soup (BeautifulSoup): The parsed profile page.
 
+    Returns:
+        str: The total capacity, or None if not found.
+    """
     # Find the "Total Capacity" label and get the text after it
     capacity_label = soup.find('u', text=lambda t: t and 'Total Capacity:' in t)
     if capacity_label:
@@ -115,8 +178,19 @@ def parse_program_name(html: str) -> str:
     Returns:
         str: The extracted program name, or None if not found.
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    return find_program_name(make_soup(html))
+
+
+def find_program_name(soup) -> str:
+    """
+    Find the program name in a parsed profile page.
+
+    Args:
+        soup (BeautifulSoup): The parsed profile page.
 
+    Returns:
+        str: The program name, or None if not found.
+    """
     # Look for the h3 tag containing "Program Name"
     h3_tags = soup.find_all('h3')
     for h3 in h3_tags:
@@ -127,47 +201,182 @@ def parse_program_name(html: str) -> str:
     return None
 
 
-def parse_availability(string: str) -> dict:
+def parse_profile_page(html: str) -> dict:
     """
-    Parse availability information from a given string to determine supported age ranges.
+    Extract every profile field used downstream from a profile page, building its tree once.
 
     Args:
-        string (str): A string containing availability information.
+        html (str): The HTML content of the profile page.
 
     Returns:
-        dict: A dictionary with age ranges as keys and boolean or specific values as needed.
+        dict: The profile's key-value pairs plus 'program_name', 'address' and 'total_capacity'.
+    """
+    soup = make_soup(html)
+    profile_data = profile_fields(soup)
+    profile_data["program_name"] = find_program_name(soup)
+    profile_data["address"] = find_site_address(soup)
+    profile_data["total_capacity"] = find_total_capacity(soup)
+    return profile_data
+
+
+def parse_search_form(html: str, select_ids: list) -> dict:
+    """
+    Extract the provider search form so it can be submitted without a browser.
+
+    Args:
+        html (str): The HTML content of the search page.
+        select_ids (list): IDs of the dropdowns whose options should be returned.
+
+    Returns:
+        dict: A dictionary with:
+            - 'action' (str): The form action URL (may be relative).
+            - 'method' (str): The form method, upper-cased.
+            - 'fields' (dict): Default form values by field name, including hidden
+              anti-forgery tokens such as __RequestVerificationToken.
+            - 'selects' (dict): For each requested dropdown ID, its field 'name' and
+              an 'options' mapping of visible text to submitted value.
+        Returns None if the form could not be found.
     """
-    age_ranges = {
-        'AGE_INFANT_MINIMUM': None,
-        'AGE_RANGE_1_YEAR': False,
-        'AGE_RANGE_2_YEARS': False,
-        'AGE_RANGE_3_YEARS': False,
-        'AGE_RANGE_4_YEARS': False,
-        'AGE_RANGE_5_YEARS': False,
-        'AGE_RANGE_INFANTS': False,
-        'AGE_RANGE_SCHOOL': False
+    soup = make_soup(html)
+
+    anchor = soup.find(id=select_ids[0]) if select_ids else None
+    form = anchor.find_parent('form') if anchor else soup.find('form')
+    if not form:
+        return None
+
+    fields = {}
+    for field in form.find_all('input'):
+        name = field.get('name')
+        field_type = (field.get('type') or 'text').lower()
+        if not name or field_type in ('submit', 'button', 'image', 'reset'):
+            continue
+        if field_type in ('checkbox', 'radio') and not field.has_attr('checked'):
+            continue
+        fields[name] = field.get('value', '')
+
+    selects = {}
+    for select in form.find_all('select'):
+        name = select.get('name')
+        options = {
+            option.get_text(strip=True): option.get('value', option.get_text(strip=True))
+            for option in select.find_all('option')
+        }
+        if name:
+            selected = select.find('option', selected=True) or select.find('option')
+            fields[name] = selected.get('value', selected.get_text(strip=True)) if selected else ''
+        if select.get('id') in select_ids:
+            selects[select['id']] = {'name': name, 'options': options}
+
+    # Include the submit button the browser would click, if it has a name
+    submit = form.find(id='btnSubmit')
+    if submit and submit.get('name'):
+        fields[submit['name']] = submit.get('value', '')
+
+    return {
+        'action': form.get('action', ''),
+        'method': (form.get('method') or 'GET').upper(),
+        'fields': fields,
+        'selects': selects,
     }
 
+
+def parse_provider_ids(html: str) -> list:
+    """
+    Extract provider IDs from a page of search results.
+
+    Args:
+        html (str): The HTML content of a search results page.
+
+    Returns:
+        list: The provider IDs on the page, in order of appearance.
+    """
+    soup = make_soup(html)
+    label = 'License/Registration ID:'
+    provider_ids = []
+
+    for td in soup.find_all('td'):
+        # Only use the innermost cell so nested result tables are not counted twice
+        if label not in td.get_text() or any(label in inner.get_text() for inner in td.find_all('td')):
+            continue
+        text = td.get_text('\n')
+        provider_id = text.split(label)[1].strip().split('\n')[0].strip()
+        if provider_id:
+            provider_ids.append(provider_id)
+
+    return provider_ids
+
+
+def parse_page_links(html: str) -> tuple:
+    """
+    Extract pagination links from a page of search results.
+
+    Args:
+        html (str): The HTML content of a search results page.
+
+    Returns:
+        tuple: (links, has_next) where links is a list of hrefs for numbered pages and
+            'Next Page', and has_next is True if a 'Next Page' control exists at all.
+    """
+    soup = make_soup(html)
+    links = []
+    has_next = False
+
+    for a in soup.find_all('a'):
+        text = a.get_text(strip=True)
+        href = a.get('href')
+        if text == 'Next Page':
+            has_next = True
+        elif not (text.isdigit() and href and 'page' in href.lower()):
+            continue
+        if href and not href.startswith(('#', 'javascript:')):
+            links.append(href)
+
+    return links, has_next
+
+
+def parse_availability_mask(string: str) -> int:
+    """
+    Parse availability information from a given string into an age range bitmask.
+
+    Args:
+        string (str): A string containing availability information.
+
+    Returns:
+        int: A bitmask of the AGE_RANGE_* bits from common.records.
+    """
+    mask = 0
+
     if not string or not isinstance(string, str):
-        return age_ranges  # Return defaults for empty or invalid input
+        return mask  # No age ranges for empty or invalid input
 
     # Check specific patterns in the string
     if "ages 6 weeks to 12 years" in string or "6 weeks" in string:
-        for key in age_ranges:
-            if key != 'AGE_INFANT_MINIMUM':  # Exclude setting this here
-                age_ranges[key] = True
-        age_ranges['AGE_INFANT_MINIMUM'] = "6 weeks"
+        mask |= AGE_RANGE_ALL
 
     if "School-Aged Children" in string:
-        age_ranges['AGE_RANGE_SCHOOL'] = True
+        mask |= AGE_RANGE_SCHOOL
 
     if "Preschoolers" in string:
-        age_ranges['AGE_RANGE_3_YEARS'] = True
-        age_ranges['AGE_RANGE_4_YEARS'] = True
-        age_ranges['AGE_RANGE_5_YEARS'] = True
+        mask |= AGE_RANGE_3_YEARS | AGE_RANGE_4_YEARS | AGE_RANGE_5_YEARS
 
     # Handle additional school-aged children
     if "additional school-aged children" in string:
-        age_ranges['AGE_RANGE_SCHOOL'] = True
+        mask |= AGE_RANGE_SCHOOL
+
+    return mask
+
+
+def parse_availability(string: str) -> dict:
+    """
+    Parse availability information from a given string to determine supported age ranges.
+
+    Args:
+        string (str): A string containing availability information.
+
+    Returns:
+        dict: A dictionary with age ranges as keys and boolean or specific values as needed.
+    """
+    mask = parse_availability_mask(string)
 
-    return age_ranges
+    # Infants are only ever set by the "6 weeks" pattern
+    return age_dict_from_mask(mask, "6 weeks" if mask & AGE_RANGE_INFANTS else None)
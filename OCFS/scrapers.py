@@ -1,24 +1,183 @@
 import os
 import csv
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
 import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Set up Chrome options
-chrome_options = webdriver.ChromeOptions()
-chrome_options.add_argument("--headless")  
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
-
 # NOTE - This must be set to the machine this is running on; parameterize in production for flexibility
 chromedriver_path = "/usr/local/bin/chromedriver"
 
+SEARCH_URL = "https://hs.ocfs.ny.gov/dcfs"
+PROVIDER_IDS_CSV = "OCFS/raw_data/provider_ids.csv"
+
+
+def create_driver():
+    """
+    Create a headless Chrome WebDriver.
+
+    Selenium is imported here rather than at module load so that stages which
+    never open a browser (e.g. reprocessing raw data) do not pay for the import
+    or require chromedriver to be installed.
+
+    Returns:
+        selenium.webdriver.Chrome: A configured headless Chrome driver.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    # Set up Chrome options
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+
+    service = Service(chromedriver_path)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+def append_provider_ids(provider_data: list):
+    """
+    Append discovered provider IDs to 'provider_ids.csv', writing the header if the file is new.
+
+    Parameters:
+        provider_data (list): (county, program_type, provider_id) tuples.
+    """
+    os.makedirs(os.path.dirname(PROVIDER_IDS_CSV), exist_ok=True)
+    file_exists = os.path.isfile(PROVIDER_IDS_CSV)
+    with open(PROVIDER_IDS_CSV, "a", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        if not file_exists:
+            writer.writerow(["county", "program_type", "provider_id"])
+        writer.writerows(provider_data)
+
+    logging.info(f"Appended {len(provider_data)} records to '{PROVIDER_IDS_CSV}'.")
+
+
+def fetch_provider_ids_http(county: str, program_type: str, max_workers: int = 8) -> list:
+    """
+    Run the provider search as plain HTTP form requests instead of driving a browser.
+
+    The search page is fetched first so the form's anti-forgery token and session
+    cookie are submitted along with the county, program type and page size. Result
+    pages linked from the pager are then fetched concurrently.
+
+    Parameters:
+        county (str): The county or borough name to filter by.
+        program_type (str): The program type to filter by.
+        max_workers (int): Maximum number of result pages fetched at once.
+
+    Returns:
+        list: The provider IDs found, in page order.
+
+    Raises:
+        RuntimeError: If the search form cannot be replayed or the results cannot be paged over HTTP.
+    """
+    import requests
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.parse import urljoin
+    from parsers import parse_search_form, parse_provider_ids, parse_page_links
+
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
+        ),
+    })
+
+    # Load the search page for its form fields, token and cookies
+    response = session.get(SEARCH_URL, timeout=30)
+    response.raise_for_status()
+    form = parse_search_form(response.text, ["ddlCounty", "ddlProgramType", "Paging_PageSize"])
+    if not form or len(form["selects"]) < 3:
+        raise RuntimeError("Search form not found on the search page")
+
+    # Fill in the same choices the browser path selects
+    fields = dict(form["fields"])
+    for select_id, text in (("ddlCounty", county), ("ddlProgramType", program_type), ("Paging_PageSize", "500")):
+        select = form["selects"][select_id]
+        if text not in select["options"]:
+            raise RuntimeError(f"Option '{text}' not found in {select_id}")
+        fields[select["name"]] = select["options"][text]
+
+    action_url = urljoin(response.url, form["action"])
+    logging.info(f"Submitting search for {county}, {program_type} to {action_url}")
+    if form["method"] == "POST":
+        response = session.post(action_url, data=fields, headers={"Referer": response.url}, timeout=60)
+    else:
+        response = session.get(action_url, params=fields, timeout=60)
+    response.raise_for_status()
+
+    # requests.Session is not thread-safe, so each fetch thread gets its own session
+    # carrying the headers and cookies of the search response
+    thread_sessions = threading.local()
+
+    def fetch(url: str) -> str:
+        if not hasattr(thread_sessions, "session"):
+            thread_sessions.session = requests.Session()
+            thread_sessions.session.headers.update(session.headers)
+            thread_sessions.session.cookies.update(session.cookies)
+        page = thread_sessions.session.get(url, headers={"Referer": response.url}, timeout=60)
+        page.raise_for_status()
+        return page.text
+
+    pages = [response.text]
+    seen_urls = {response.url}
+    pending = [response.text]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            # Collect every pager link not yet fetched and fetch them together
+            urls = []
+            for html in pending:
+                links, has_next = parse_page_links(html)
+                if has_next and not links:
+                    raise RuntimeError("Result pages are not reachable by URL")
+                for link in links:
+                    url = urljoin(response.url, link)
+                    if url not in seen_urls:
+                        seen_urls.add(url)
+                        urls.append(url)
+
+            pending = list(executor.map(fetch, urls))
+            pages.extend(pending)
+
+    # Pages can be reached through more than one link, so keep the first occurrence of each ID
+    provider_ids = list(dict.fromkeys(
+        provider_id for html in pages for provider_id in parse_provider_ids(html)
+    ))
+    logging.info(f"Fetched {len(provider_ids)} provider IDs over HTTP from {len(pages)} pages.")
+    return provider_ids
+
+
+def discover_provider_ids(county: str, program_type: str, backend: str = "http"):
+    """
+    Discover provider IDs for a county and program type and append them to 'provider_ids.csv'.
+
+    The HTTP backend is tried first; if it fails or finds nothing, the Selenium
+    browser path is used instead.
+
+    Parameters:
+        county (str): The county or borough name to filter by.
+        program_type (str): The program type to filter by.
+        backend (str): 'http' to try HTTP form replay first, or 'selenium' to use the browser only.
+    """
+    if backend == "http":
+        try:
+            provider_ids = fetch_provider_ids_http(county, program_type)
+            if provider_ids:
+                append_provider_ids([(county, program_type, provider_id) for provider_id in provider_ids])
+                return
+            logging.warning(f"HTTP discovery found no provider IDs for {county}, {program_type}.")
+        except Exception as e:
+            logging.warning(f"HTTP discovery failed for {county}, {program_type}: {e}")
+        logging.info("Falling back to Selenium discovery.")
+
+    scrape_provider_ids(county, program_type)
+
+
 def scrape_provider_ids(county: str, program_type: str):
     """
     Scrape provider IDs from the OCFS website based on the given county and program type.
@@ -35,16 +194,15 @@ def scrape_provider_ids(county: str, program_type: str):
         - program_type
         - provider_id
     """
-    # Set up the ChromeDriver
-    service = Service(chromedriver_path)
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import Select
 
-    # CSV file path
-    csv_file = "OCFS/raw_data/provider_ids.csv"
+    # Set up the ChromeDriver
+    driver = create_driver()
 
     try:
         # Navigate to the website
-        url = "https://hs.ocfs.ny.gov/dcfs"
+        url = SEARCH_URL
         logging.info(f"Navigating to {url}")
         driver.get(url)
 
@@ -99,14 +257,7 @@ def scrape_provider_ids(county: str, program_type: str):
                 break
 
         # Write data to the CSV
-        file_exists = os.path.isfile(csv_file)
-        with open(csv_file, "a", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            if not file_exists:
-                writer.writerow(["county", "program_type", "provider_id"])
-            writer.writerows(provider_data)
-
-        logging.info(f"Appended {len(provider_data)} records to '{csv_file}'.")
+        append_provider_ids(provider_data)
 
     finally:
         # Clean up resources
@@ -123,8 +274,7 @@ def scrape_html_from_url(url: str) -> str:
     Returns:
         str: The HTML content of the page, or None if an error occurs.
     """
-    service = Service(chromedriver_path)
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver = create_driver()
 
     try:
         logging.info(f"Navigating to URL: {url}")
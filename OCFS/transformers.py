@@ -1,30 +1,36 @@
 import os
 import json
 import logging
+from common.records import AGE_RANGE_STRINGS, RESULT_FIELDS, ProviderRecord, age_mask_from_dict
 
+# OCFS results leave AGE_INFANT_MINIMUM to post-processing
+OCFS_RESULT_FIELDS = tuple(field for field in RESULT_FIELDS if field != "AGE_INFANT_MINIMUM")
 
-def build_profile_records(profiles_folder: str, locations_folder: str) -> list:
+
+def iter_profile_records(profiles_folder: str, locations_folder: str):
     """
-    Build a list of profile records by combining profile JSON files with corresponding location JSON files.
+    Yield profile records one at a time, each combined with its location JSON file.
+
+    Only one profile (and its location) is held in memory at a time, so callers
+    that consume the records as a stream use constant memory.
 
     Args:
         profiles_folder (str): Path to the folder containing profile JSON files.
         locations_folder (str): Path to the folder containing location JSON files.
 
-    Returns:
-        list: A list of dictionaries representing combined profile and location data.
+    Yields:
+        dict: The combined profile and location data for one provider.
     """
-    profiles = []
-
     # Iterate through all JSON files in the profiles folder
-    for profile_file in os.listdir(profiles_folder):
-        profile_path = os.path.join(profiles_folder, profile_file)
+    with os.scandir(profiles_folder) as entries:
+        for entry in entries:
+            profile_file = entry.name
 
-        if profile_file.endswith(".json"):  # Ensure it's a JSON file
-            record_id = profile_file.replace("profile_", "").replace(".json", "")
+            if profile_file.endswith(".json"):  # Ensure it's a JSON file
+                record_id = profile_file.replace("profile_", "").replace(".json", "")
 
-            with open(profile_path, 'r', encoding='utf-8') as file:
-                profile_record = json.load(file)  # Load JSON data
+                with open(entry.path, 'r', encoding='utf-8') as file:
+                    profile_record = json.load(file)  # Load JSON data
                 profile_record['record_id'] = record_id  # Add the record ID
 
                 # Check for a matching location file
@@ -38,9 +44,21 @@ def build_profile_records(profiles_folder: str, locations_folder: str) -> list:
                     location_data = None  # No matching location data
 
                 profile_record['location_data'] = location_data
-                profiles.append(profile_record)  # Append combined data
+                yield profile_record
+
+
+def build_profile_records(profiles_folder: str, locations_folder: str) -> list:
+    """
+    Build a list of profile records by combining profile JSON files with corresponding location JSON files.
+
+    Args:
+        profiles_folder (str): Path to the folder containing profile JSON files.
+        locations_folder (str): Path to the folder containing location JSON files.
 
-    return profiles
+    Returns:
+        list: A list of dictionaries representing combined profile and location data.
+    """
+    return list(iter_profile_records(profiles_folder, locations_folder))
 
 
 def build_availability_string(age_dict: dict) -> str:
@@ -53,60 +71,55 @@ def build_availability_string(age_dict: dict) -> str:
     Returns:
         str: A formatted string listing available age ranges, separated by '|~|'.
     """
-    age_brackets = [
-        ('AGE_RANGE_INFANTS', '0-12 Months (Infant)'),
-        ('AGE_RANGE_1_YEAR', '1 year'),
-        ('AGE_RANGE_2_YEARS', '2 years'),
-        ('AGE_RANGE_3_YEARS', '3 years'),
-        ('AGE_RANGE_4_YEARS', '4 years'),
-        ('AGE_RANGE_5_YEARS', '5 years'),
-        ('AGE_RANGE_SCHOOL', 'School-age')
-    ]
+    return AGE_RANGE_STRINGS[age_mask_from_dict(age_dict)]
 
-    result = []
 
-    # Check each age range and append its label if available
-    for key, label in age_brackets:
-        if age_dict.get(key, False):  # Default to False if key is missing
-            result.append(label)
+def transform_record(record: dict) -> dict:
+    """
+    Transform a record dictionary to match the template CSV column structure.
 
-    return '|~|'.join(result)
+    Args:
+        record (dict): The input record with keys and values to map. Age ranges are
+            read from 'age_mask', or from a legacy 'age_ranges' dict if it is missing.
 
+    Returns:
+        dict: A transformed dictionary with keys matching the template columns.
+    """
+    return build_provider_record(record).to_dict(OCFS_RESULT_FIELDS)
 
-def transform_record(record: dict) -> dict:
+
+def build_provider_record(record: dict) -> ProviderRecord:
     """
-    Transform a record dictionary to match the template CSV column structure.
+    Build a ProviderRecord from a combined profile record.
 
     Args:
         record (dict): The input record with keys and values to map.
 
     Returns:
-        dict: A transformed dictionary with keys matching the template columns.
+        ProviderRecord: The provider in the result data model.
     """
-    county_info = record.get("county_info", {})
-
-    transformed_record = {
-        "PROGRAM_NAME": record.get("program_name", ""),
-        "ADDRESS_CITY": county_info.get("county", "Unknown City"),
-        "ADDRESS_COUNTRY": "United States",  # Hardcoded value
-        "ADDRESS_BOUROUGH": record.get("School District", ""),
-        "ADDRESS_COUNTY": county_info.get("county", ""),
-        "ADDRESS_LATITUDE": record.get("lat", ""),
-        "ADDRESS_LONGITUDE": record.get("long", ""),
-        "ADDRESS_STATE": "New York",  # Hardcoded value
-        "ADDRESS_STREET": record.get("address", "").split(",")[0] if record.get("address") else "",
-        "ADDRESS_ZIPCODE": record.get("address", "").split(",")[-1].strip().replace('NY ', "") if record.get("address") else "",
-        "AGE_RANGE": record.get("age_range_string", ""),
-        "AGE_RANGE_1_YEAR": record.get("age_ranges", {}).get("AGE_RANGE_1_YEAR", False),
-        "AGE_RANGE_2_YEARS": record.get("age_ranges", {}).get("AGE_RANGE_2_YEARS", False),
-        "AGE_RANGE_3_YEARS": record.get("age_ranges", {}).get("AGE_RANGE_3_YEARS", False),
-        "AGE_RANGE_4_YEARS": record.get("age_ranges", {}).get("AGE_RANGE_4_YEARS", False),
-        "AGE_RANGE_5_YEARS": record.get("age_ranges", {}).get("AGE_RANGE_5_YEARS", False),
-        "AGE_RANGE_INFANTS": record.get("age_ranges", {}).get("AGE_RANGE_INFANTS", False),
-        "AGE_RANGE_SCHOOL": record.get("age_ranges", {}).get("AGE_RANGE_SCHOOL", False),
-        "GEN_PHONE_1": record.get("Phone", ""),
-        "GEN_PROGRAM_SETTING": record.get("Program Type", ""),
-        "GEN_WEBSITE": f"https://hs.ocfs.ny.gov/DCFS/Profile/Index/{record['record_id']}"  # Constructed URL
-    }
-
-    return transformed_record
+    county_info = record.get("county_info") or {}
+    address = record.get("address")
+
+    # Records from before the age bitmask carry a 'age_ranges' dict instead of 'age_mask'
+    if "age_mask" in record:
+        age_mask, age_infant_minimum = record["age_mask"], None
+    else:
+        age_dict = record.get("age_ranges") or {}
+        age_mask, age_infant_minimum = age_mask_from_dict(age_dict), age_dict.get("AGE_INFANT_MINIMUM")
+
+    return ProviderRecord(
+        program_name=record.get("program_name", ""),
+        address_city=county_info.get("county", "Unknown City"),
+        address_borough=record.get("School District", ""),
+        address_county=county_info.get("county", ""),
+        latitude=record.get("lat", ""),
+        longitude=record.get("long", ""),
+        address_street=address.split(",")[0] if address else "",
+        address_zipcode=address.split(",")[-1].strip().replace('NY ', "") if address else "",
+        age_mask=age_mask,
+        age_infant_minimum=age_infant_minimum,
+        phone=record.get("Phone", ""),
+        program_setting=record.get("Program Type", ""),
+        website=f"https://hs.ocfs.ny.gov/DCFS/Profile/Index/{record['record_id']}",  # Constructed URL
+    )
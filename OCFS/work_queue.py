@@ -0,0 +1,347 @@
+import logging
+import os
+import sqlite3
+import time
+
+
+class WorkQueue:
+    """
+    A durable, SQLite-backed queue of provider IDs shared by crawl workers.
+
+    The database uses WAL journaling, which requires every worker to run on the
+    same machine as the queue file; it is not safe on a network filesystem.
+
+    Workers lease batches of IDs for a visibility timeout and then mark each one
+    done or failed. A lease that is not resolved before it expires (e.g. the worker
+    died) becomes visible again and is handed to the next worker that asks for work.
+    IDs that keep failing are parked as 'failed' after `max_attempts` leases.
+    """
+
+    def __init__(self, db_path: str, visibility_timeout: float = 600, max_attempts: int = 3):
+        """
+        Open (and create if needed) the queue database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            visibility_timeout (float): Seconds a leased ID stays hidden from other workers.
+            max_attempts (int): Number of leases after which an ID is marked failed.
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        # Autocommit mode; transactions are opened explicitly where they matter
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                provider_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires)")
+
+    def enqueue(self, provider_ids) -> int:
+        """
+        Add provider IDs to the queue. IDs already present keep their current state.
+
+        Args:
+            provider_ids (iterable): Provider IDs to add.
+
+        Returns:
+            int: The number of newly added IDs.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (provider_id, updated_at) VALUES (?, ?)",
+                ((provider_id, now) for provider_id in provider_ids),
+            )
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return added
+
+    def lease(self, worker_id: str, batch_size: int = 10) -> list:
+        """
+        Lease up to `batch_size` pending or expired IDs for the given worker.
+
+        Args:
+            worker_id (str): Identifier of the leasing worker.
+            batch_size (int): Maximum number of IDs to lease.
+
+        Returns:
+            list: The leased provider IDs (empty if nothing is available).
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that have used up their attempts are parked rather than retried
+            self.conn.execute(
+                """
+                UPDATE tasks SET status = 'failed', worker_id = NULL, lease_expires = NULL,
+                    last_error = COALESCE(last_error, 'lease expired'), updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts),
+            )
+
+            rows = self.conn.execute(
+                """
+                SELECT provider_id FROM tasks
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY rowid
+                LIMIT ?
+                """,
+                (now, batch_size),
+            ).fetchall()
+            provider_ids = [row[0] for row in rows]
+
+            self.conn.executemany(
+                """
+                UPDATE tasks SET status = 'leased', worker_id = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE provider_id = ?
+                """,
+                ((worker_id, now + self.visibility_timeout, now, provider_id) for provider_id in provider_ids),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return provider_ids
+
+    def extend(self, provider_id: str, worker_id: str) -> bool:
+        """
+        Renew a held lease for another full visibility timeout.
+
+        Workers call this before starting on each ID of a batch, so a slow batch
+        does not outlive its lease and get handed to a second worker.
+
+        Args:
+            provider_id (str): The provider ID.
+            worker_id (str): The worker holding the lease.
+
+        Returns:
+            bool: True if the lease was still held by this worker, otherwise False.
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks SET lease_expires = ?, updated_at = ?
+            WHERE provider_id = ? AND status = 'leased' AND worker_id = ?
+            """,
+            (now + self.visibility_timeout, now, provider_id, worker_id),
+        )
+        if cursor.rowcount == 0:
+            logging.warning(f"Lease for provider ID {provider_id} was no longer held by {worker_id}.")
+            return False
+        return True
+
+    def complete(self, provider_id: str, worker_id: str) -> bool:
+        """
+        Mark a leased ID as done.
+
+        Args:
+            provider_id (str): The provider ID.
+            worker_id (str): The worker holding the lease.
+
+        Returns:
+            bool: True if the lease was still held by this worker, otherwise False.
+        """
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks SET status = 'done', worker_id = NULL, lease_expires = NULL,
+                last_error = NULL, updated_at = ?
+            WHERE provider_id = ? AND status = 'leased' AND worker_id = ?
+            """,
+            (time.time(), provider_id, worker_id),
+        )
+        if cursor.rowcount == 0:
+            logging.warning(f"Lease for provider ID {provider_id} was no longer held by {worker_id}.")
+            return False
+        return True
+
+    def fail(self, provider_id: str, worker_id: str, error: str) -> bool:
+        """
+        Release a leased ID after an error. It is retried until `max_attempts` is reached.
+
+        Args:
+            provider_id (str): The provider ID.
+            worker_id (str): The worker holding the lease.
+            error (str): A description of the failure.
+
+        Returns:
+            bool: True if the lease was still held by this worker, otherwise False.
+        """
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker_id = NULL, lease_expires = NULL, last_error = ?, updated_at = ?
+            WHERE provider_id = ? AND status = 'leased' AND worker_id = ?
+            """,
+            (self.max_attempts, error, time.time(), provider_id, worker_id),
+        )
+        if cursor.rowcount == 0:
+            logging.warning(f"Lease for provider ID {provider_id} was no longer held by {worker_id}.")
+            return False
+        return True
+
+    def retry_failed(self) -> int:
+        """
+        Return every failed ID to the queue with its attempts reset.
+
+        Returns:
+            int: The number of requeued IDs.
+        """
+        cursor = self.conn.execute(
+            """
+            UPDATE tasks SET status = 'pending', attempts = 0, last_error = NULL, updated_at = ?
+            WHERE status = 'failed'
+            """,
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        """
+        Count queued IDs by status.
+
+        Returns:
+            dict: A mapping of status ('pending', 'leased', 'done', 'failed') to count.
+        """
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def is_drained(self) -> bool:
+        """
+        Check whether every ID has reached a final state (done or failed).
+
+        Returns:
+            bool: True if no IDs are pending or leased.
+        """
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def reset(self):
+        """
+        Remove every ID from the queue.
+        """
+        self.conn.execute("DELETE FROM tasks")
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+
+def _self_check_worker(db_path: str, fail_id: str, results):
+    """
+    Drain the queue like a crawl worker, failing `fail_id` on every attempt.
+    """
+    worker_id = f"check-{os.getpid()}"
+    queue = WorkQueue(db_path, visibility_timeout=1)
+    done = []
+    while True:
+        provider_ids = queue.lease(worker_id, batch_size=5)
+        if not provider_ids:
+            if queue.is_drained():
+                break
+            time.sleep(0.2)
+            continue
+        for provider_id in provider_ids:
+            if not queue.extend(provider_id, worker_id):
+                continue
+            if provider_id == fail_id:
+                queue.fail(provider_id, worker_id, "simulated failure")
+            elif queue.complete(provider_id, worker_id):
+                done.append(provider_id)
+    queue.close()
+    results.put(done)
+
+
+def self_check(workers: int = 4, total: int = 200):
+    """
+    Exercise leasing, lease expiry and requeueing with several local worker processes.
+
+    A 'dead' worker leases a batch and never resolves it; the live workers must pick
+    those IDs up once the lease expires, complete every ID exactly once, and park an
+    ID that always fails after `max_attempts` leases.
+
+    Args:
+        workers (int): Number of worker processes to start.
+        total (int): Number of provider IDs to queue.
+
+    Raises:
+        RuntimeError: If the queue did not behave as expected.
+    """
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "work_queue.db")
+        queue = WorkQueue(db_path, visibility_timeout=1)
+        added = queue.enqueue(str(i) for i in range(total))
+        requeued = queue.enqueue(["0", "1"])
+
+        # A worker that leases a batch and then dies without resolving it
+        abandoned = queue.lease("dead-worker", batch_size=3)
+
+        results = multiprocessing.Queue()
+        fail_id = str(total - 1)
+        processes = [
+            multiprocessing.Process(target=_self_check_worker, args=(db_path, fail_id, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        done = [provider_id for _ in processes for provider_id in results.get()]
+        for process in processes:
+            process.join()
+
+        counts = queue.counts()
+        attempts, last_error = queue.conn.execute(
+            "SELECT attempts, last_error FROM tasks WHERE provider_id = ?", (fail_id,)
+        ).fetchone()
+        queue.close()
+
+    # Explicit checks rather than asserts, so the check still runs under `python -O`
+    failures = []
+    if (added, requeued) != (total, 0):
+        failures.append(f"enqueue added {added} then {requeued} IDs, expected {total} then 0")
+    if sorted(done) != sorted(str(i) for i in range(total - 1)):
+        failures.append("not every ID was completed exactly once")
+    if not set(abandoned) <= set(done):
+        failures.append("abandoned leases were not requeued")
+    if counts != {"pending": 0, "leased": 0, "done": total - 1, "failed": 1}:
+        failures.append(f"unexpected final queue status {counts}")
+    if (attempts, last_error) != (3, "simulated failure"):
+        failures.append(f"failing ID ended with attempts={attempts}, last_error={last_error!r}")
+    if failures:
+        raise RuntimeError("Work queue self-check failed: " + "; ".join(failures))
+
+    logging.info(f"Work queue self-check passed with {workers} workers: {counts}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    self_check()
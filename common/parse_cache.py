@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+
+class ParseCache:
+    """
+    A persistent cache of parser results keyed by (parser, parser version, HTML hash).
+
+    Wrapping a parser with `wrap` makes byte-identical HTML skip parsing entirely on
+    later runs. Entries written by any other version of a parser are deleted when it
+    is wrapped, so bumping a parser's version forces its pages to be parsed again.
+
+    By default every new entry is committed on its own, so several crawl workers
+    can share one cache file without holding its write lock for long. A single
+    process can buffer entries with `commit_every` to write them faster.
+    """
+
+    def __init__(self, db_path: str, commit_every: int = 1):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            commit_every (int): Number of new entries written per transaction. Keep this at 1
+                when other processes write to the same cache.
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.commit_every = commit_every
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Autocommit mode; buffered entries are wrapped in an explicit transaction in `put`
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                parser TEXT NOT NULL,
+                version TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (parser, version, content_hash)
+            )
+            """
+        )
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        """
+        Hash HTML content for use as a cache key.
+
+        Args:
+            html (str): The HTML content as a string.
+
+        Returns:
+            str: The SHA-256 hex digest of the content.
+        """
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    def get(self, parser: str, version: str, content_hash: str):
+        """
+        Look up a cached parser result.
+
+        Args:
+            parser (str): The parser name.
+            version (str): The parser version.
+            content_hash (str): The hash of the parsed HTML.
+
+        Returns:
+            tuple: (found, result) where found is False on a cache miss.
+        """
+        row = self.conn.execute(
+            "SELECT result FROM parse_cache WHERE parser = ? AND version = ? AND content_hash = ?",
+            (parser, version, content_hash),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def put(self, parser: str, version: str, content_hash: str, result):
+        """
+        Store a parser result. Results must be JSON-serializable.
+
+        Args:
+            parser (str): The parser name.
+            version (str): The parser version.
+            content_hash (str): The hash of the parsed HTML.
+            result: The parser's return value.
+        """
+        value = json.dumps(result)
+        if self.commit_every > 1 and not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "INSERT OR REPLACE INTO parse_cache (parser, version, content_hash, result) VALUES (?, ?, ?, ?)",
+            (parser, version, content_hash, value),
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.flush()
+
+    def retain(self, parsers: list):
+        """
+        Delete entries of every parser not in `parsers`, e.g. parsers that were removed or merged.
+
+        Args:
+            parsers (list): Names of the parsers whose entries are kept.
+        """
+        placeholders = ", ".join("?" * len(parsers))
+        try:
+            self.conn.execute(f"DELETE FROM parse_cache WHERE parser NOT IN ({placeholders})", list(parsers))
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Could not clear parse cache entries of other parsers: {e}")
+
+    def wrap(self, func, version: str):
+        """
+        Put the cache in front of a parser that takes an HTML string.
+
+        Args:
+            func (callable): The parser function.
+            version (str): The parser version; entries from other versions are discarded.
+
+        Returns:
+            callable: A function with the same signature that consults the cache first.
+        """
+        parser = func.__name__
+        try:
+            self.conn.execute("DELETE FROM parse_cache WHERE parser = ? AND version != ?", (parser, version))
+        except sqlite3.OperationalError as e:
+            # Old-version entries are never read, so they can be cleared by a later run
+            logging.warning(f"Could not clear old parse cache entries for {parser}: {e}")
+
+        @functools.wraps(func)
+        def cached(html):
+            if not html:
+                return func(html)
+
+            key = self.content_hash(html)
+            try:
+                found, result = self.get(parser, version, key)
+            except sqlite3.Error as e:
+                logging.warning(f"Parse cache lookup failed for {parser}: {e}")
+                found = False
+            if found:
+                self.hits += 1
+                return result
+
+            self.misses += 1
+            result = func(html)
+            try:
+                self.put(parser, version, key, result)
+            except sqlite3.Error as e:
+                # A cache write failure must not fail the page that was just parsed
+                logging.warning(f"Parse cache write failed for {parser}: {e}")
+            return result
+
+        return cached
+
+    def flush(self):
+        """
+        Commit buffered entries.
+        """
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+        self.pending = 0
+
+    def close(self):
+        """
+        Commit buffered entries and close the database connection.
+        """
+        self.flush()
+        logging.info(f"Parse cache: {self.hits} hits, {self.misses} misses.")
+        self.conn.close()
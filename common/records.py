@@ -0,0 +1,314 @@
+"""
+Compact provider record shared by the NYCH and OCFS pipelines.
+
+Age ranges are stored as an int bitmask rather than a dict of booleans, and the
+'|~|'-separated availability strings are looked up in a table indexed by that mask.
+"""
+
+# Age range bits, in the order their labels appear in the availability string
+AGE_RANGE_INFANTS = 1 << 0
+AGE_RANGE_1_YEAR = 1 << 1
+AGE_RANGE_2_YEARS = 1 << 2
+AGE_RANGE_3_YEARS = 1 << 3
+AGE_RANGE_4_YEARS = 1 << 4
+AGE_RANGE_5_YEARS = 1 << 5
+AGE_RANGE_SCHOOL = 1 << 6
+
+# (column name, bit, availability label)
+AGE_RANGE_BRACKETS = (
+    ("AGE_RANGE_INFANTS", AGE_RANGE_INFANTS, "0-12 Months (Infant)"),
+    ("AGE_RANGE_1_YEAR", AGE_RANGE_1_YEAR, "1 year"),
+    ("AGE_RANGE_2_YEARS", AGE_RANGE_2_YEARS, "2 years"),
+    ("AGE_RANGE_3_YEARS", AGE_RANGE_3_YEARS, "3 years"),
+    ("AGE_RANGE_4_YEARS", AGE_RANGE_4_YEARS, "4 years"),
+    ("AGE_RANGE_5_YEARS", AGE_RANGE_5_YEARS, "5 years"),
+    ("AGE_RANGE_SCHOOL", AGE_RANGE_SCHOOL, "School-age"),
+)
+
+AGE_RANGE_ALL = (1 << len(AGE_RANGE_BRACKETS)) - 1
+
+# Column order of the legacy age range dicts and CSV files
+AGE_RANGE_COLUMNS = (
+    "AGE_RANGE_1_YEAR",
+    "AGE_RANGE_2_YEARS",
+    "AGE_RANGE_3_YEARS",
+    "AGE_RANGE_4_YEARS",
+    "AGE_RANGE_5_YEARS",
+    "AGE_RANGE_INFANTS",
+    "AGE_RANGE_SCHOOL",
+)
+
+AGE_RANGE_BITS = {column: bit for column, bit, _ in AGE_RANGE_BRACKETS}
+
+# Availability string for every possible mask
+AGE_RANGE_STRINGS = tuple(
+    "|~|".join(label for _, bit, label in AGE_RANGE_BRACKETS if mask & bit)
+    for mask in range(AGE_RANGE_ALL + 1)
+)
+
+# Column order of the combined results_final.csv
+RESULT_FIELDS = (
+    "PROGRAM_NAME",
+    "ADDRESS_CITY",
+    "ADDRESS_COUNTRY",
+    "ADDRESS_BOUROUGH",
+    "ADDRESS_COUNTY",
+    "ADDRESS_LATITUDE",
+    "ADDRESS_LONGITUDE",
+    "ADDRESS_STATE",
+    "ADDRESS_STREET",
+    "ADDRESS_ZIPCODE",
+    "AGE_INFANT_MINIMUM",
+    "AGE_RANGE",
+    *AGE_RANGE_COLUMNS,
+    "GEN_PHONE_1",
+    "GEN_PROGRAM_SETTING",
+    "GEN_WEBSITE",
+)
+
+
+def parse_bool(value) -> bool:
+    """
+    Interpret a boolean that may have been round-tripped through CSV.
+
+    Args:
+        value: A bool, or a string such as 'True' or 'False'.
+
+    Returns:
+        bool: The interpreted value.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def age_mask_from_dict(age_dict: dict) -> int:
+    """
+    Convert a dict of AGE_RANGE_* flags into a bitmask.
+
+    Args:
+        age_dict (dict): Dictionary with age range keys and boolean (or CSV string) values.
+
+    Returns:
+        int: The age range bitmask.
+    """
+    mask = 0
+    if not age_dict:
+        return mask
+
+    for column, bit, _ in AGE_RANGE_BRACKETS:
+        if parse_bool(age_dict.get(column, False)):
+            mask |= bit
+    return mask
+
+
+def age_dict_from_mask(mask: int, infant_minimum: str = None) -> dict:
+    """
+    Convert a bitmask back into the legacy dict of age range flags.
+
+    Args:
+        mask (int): The age range bitmask.
+        infant_minimum (str): Value for the AGE_INFANT_MINIMUM key.
+
+    Returns:
+        dict: A dictionary with AGE_INFANT_MINIMUM and the AGE_RANGE_* booleans.
+    """
+    age_dict = {"AGE_INFANT_MINIMUM": infant_minimum}
+    for column in AGE_RANGE_COLUMNS:
+        age_dict[column] = bool(mask & AGE_RANGE_BITS[column])
+    return age_dict
+
+
+class ProviderRecord:
+    """
+    A single child care provider in the result data model.
+    """
+
+    __slots__ = (
+        "program_name",
+        "address_city",
+        "address_country",
+        "address_borough",
+        "address_county",
+        "latitude",
+        "longitude",
+        "address_state",
+        "address_street",
+        "address_zipcode",
+        "age_infant_minimum",
+        "age_mask",
+        "phone",
+        "program_setting",
+        "website",
+    )
+
+    def __init__(
+        self,
+        program_name="",
+        address_city="",
+        address_country="United States",
+        address_borough="",
+        address_county="",
+        latitude="",
+        longitude="",
+        address_state="New York",
+        address_street="",
+        address_zipcode="",
+        age_infant_minimum=None,
+        age_mask=0,
+        phone="",
+        program_setting="",
+        website="",
+    ):
+        self.program_name = program_name
+        self.address_city = address_city
+        self.address_country = address_country
+        self.address_borough = address_borough
+        self.address_county = address_county
+        self.latitude = latitude
+        self.longitude = longitude
+        self.address_state = address_state
+        self.address_street = address_street
+        self.address_zipcode = address_zipcode
+        self.age_infant_minimum = age_infant_minimum
+        self.age_mask = age_mask
+        self.phone = phone
+        self.program_setting = program_setting
+        self.website = website
+
+    def __repr__(self):
+        return f"ProviderRecord(program_name={self.program_name!r}, age_mask={self.age_mask})"
+
+    def __eq__(self, other):
+        if not isinstance(other, ProviderRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @property
+    def age_range(self) -> str:
+        """
+        str: The '|~|'-separated availability string for this record's age ranges.
+        """
+        return AGE_RANGE_STRINGS[self.age_mask]
+
+    def has_age_range(self, bit: int) -> bool:
+        """
+        Check whether the record serves the given age range.
+
+        Args:
+            bit (int): One of the AGE_RANGE_* bit constants.
+
+        Returns:
+            bool: True if the bit is set in the record's mask.
+        """
+        return bool(self.age_mask & bit)
+
+    def to_row(self, fields=RESULT_FIELDS) -> list:
+        """
+        Convert the record into a list of column values, e.g. for csv.writer.
+
+        Pipelines writing many records should build the converter once with
+        `row_builder(fields)` rather than calling this per record.
+
+        Args:
+            fields (tuple): The columns to include, in output order.
+
+        Returns:
+            list: The column values in the order of `fields`.
+        """
+        return row_builder(fields)(self)
+
+    def to_dict(self, fields=RESULT_FIELDS) -> dict:
+        """
+        Convert the record into a dict keyed by result CSV column names.
+
+        Args:
+            fields (tuple): The columns to include, in output order.
+
+        Returns:
+            dict: The record in the CSV schema.
+        """
+        return dict(zip(fields, self.to_row(fields)))
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "ProviderRecord":
+        """
+        Build a record from a dict in the result CSV schema (e.g. a row read back from CSV).
+
+        Args:
+            row (dict): The record keyed by result CSV column names.
+
+        Returns:
+            ProviderRecord: The parsed record.
+        """
+        return cls(
+            program_name=row.get("PROGRAM_NAME", ""),
+            address_city=row.get("ADDRESS_CITY", ""),
+            address_country=row.get("ADDRESS_COUNTRY", ""),
+            address_borough=row.get("ADDRESS_BOUROUGH", ""),
+            address_county=row.get("ADDRESS_COUNTY", ""),
+            latitude=row.get("ADDRESS_LATITUDE", ""),
+            longitude=row.get("ADDRESS_LONGITUDE", ""),
+            address_state=row.get("ADDRESS_STATE", ""),
+            address_street=row.get("ADDRESS_STREET", ""),
+            address_zipcode=row.get("ADDRESS_ZIPCODE", ""),
+            age_infant_minimum=row.get("AGE_INFANT_MINIMUM"),
+            age_mask=age_mask_from_dict(row),
+            phone=row.get("GEN_PHONE_1", ""),
+            program_setting=row.get("GEN_PROGRAM_SETTING", ""),
+            website=row.get("GEN_WEBSITE", ""),
+        )
+
+
+# Record attribute holding each result column that is stored as-is
+FIELD_ATTRIBUTES = {
+    "PROGRAM_NAME": "program_name",
+    "ADDRESS_CITY": "address_city",
+    "ADDRESS_COUNTRY": "address_country",
+    "ADDRESS_BOUROUGH": "address_borough",
+    "ADDRESS_COUNTY": "address_county",
+    "ADDRESS_LATITUDE": "latitude",
+    "ADDRESS_LONGITUDE": "longitude",
+    "ADDRESS_STATE": "address_state",
+    "ADDRESS_STREET": "address_street",
+    "ADDRESS_ZIPCODE": "address_zipcode",
+    "AGE_INFANT_MINIMUM": "age_infant_minimum",
+    "GEN_PHONE_1": "phone",
+    "GEN_PROGRAM_SETTING": "program_setting",
+    "GEN_WEBSITE": "website",
+}
+
+# Values of the mask-derived columns (AGE_RANGE and the AGE_RANGE_* flags) for every possible mask
+AGE_COLUMN_VALUES = tuple(
+    {"AGE_RANGE": AGE_RANGE_STRINGS[mask], **{column: bool(mask & bit) for column, bit, _ in AGE_RANGE_BRACKETS}}
+    for mask in range(AGE_RANGE_ALL + 1)
+)
+
+_row_builders = {}
+
+
+def row_builder(fields=RESULT_FIELDS):
+    """
+    Build (or reuse) a function converting a ProviderRecord into a row of column values.
+
+    Args:
+        fields (tuple): The columns to include, in output order.
+
+    Returns:
+        callable: A function taking a ProviderRecord and returning a list of values.
+    """
+    fields = tuple(fields)
+    if fields in _row_builders:
+        return _row_builders[fields]
+
+    getters = tuple(
+        (FIELD_ATTRIBUTES[field], None) if field in FIELD_ATTRIBUTES else (None, field)
+        for field in fields
+    )
+
+    def build_row(record: ProviderRecord) -> list:
+        age_values = AGE_COLUMN_VALUES[record.age_mask]
+        return [getattr(record, attribute) if attribute else age_values[column] for attribute, column in getters]
+
+    _row_builders[fields] = build_row
+    return build_row
@@ -0,0 +1,332 @@
+"""
+Indexed SQLite serving store for the combined provider dataset (results_final.csv).
+
+Usage:
+    python -m common.store results_final.csv results_final.db [--prune]
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+import sqlite3
+import time
+from common.records import AGE_RANGE_BITS, AGE_RANGE_COLUMNS, AGE_RANGE_STRINGS, RESULT_FIELDS, age_mask_from_dict
+
+INDEXED_COLUMNS = ("ADDRESS_ZIPCODE", "ADDRESS_BOUROUGH", "GEN_PROGRAM_SETTING", "age_mask", *AGE_RANGE_COLUMNS)
+
+REAL_COLUMNS = ("ADDRESS_LATITUDE", "ADDRESS_LONGITUDE")
+
+# OCFS records link to a profile page that carries the provider ID
+OCFS_PROFILE_URL = re.compile(r"/DCFS/Profile/Index/(\w+)")
+
+
+def record_key(record: dict) -> str:
+    """
+    Build the identity of a provider location, used to update records in place across runs.
+
+    Args:
+        record (dict): A record in the result CSV schema.
+
+    Returns:
+        str: 'OCFS|<provider ID>' for records with an OCFS profile URL, otherwise a key
+            built from the program name, street and zip code.
+    """
+    match = OCFS_PROFILE_URL.search(record.get("GEN_WEBSITE") or "")
+    if match:
+        return f"OCFS|{match.group(1)}"
+
+    parts = (record.get("PROGRAM_NAME"), record.get("ADDRESS_STREET"), record.get("ADDRESS_ZIPCODE"))
+    return "|".join(" ".join(str(part or "").upper().split()) for part in parts)
+
+
+def search_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word, with FTS5 syntax escaped.
+
+    Args:
+        text (str): Search text, e.g. "Children's" or 'little-stars'.
+
+    Returns:
+        str: An FTS5 query with each word quoted as a string.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def row_to_record(row: sqlite3.Row) -> dict:
+    """
+    Convert a providers row back into the result CSV schema.
+
+    Args:
+        row (sqlite3.Row): A row selecting RESULT_FIELDS.
+
+    Returns:
+        dict: The record, with the AGE_RANGE_* flags as booleans rather than the stored 0/1.
+    """
+    record = dict(row)
+    for column in AGE_RANGE_COLUMNS:
+        record[column] = bool(record[column])
+    return record
+
+
+class ProviderStore:
+    """
+    An embedded database of provider records with indexed lookups.
+
+    Records are keyed by OCFS provider ID, or by program name, street and zip code
+    for records without one, so loading a new run updates existing providers in
+    place. Rows of one load that share a key (e.g. NYCH lists a provider once per
+    age range) are merged, with their age range flags combined. Zip code, borough, program setting and
+    the age range flags are indexed, and PROGRAM_NAME has a full-text index.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the store.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function("age_range_string", 1, lambda mask: AGE_RANGE_STRINGS[mask], deterministic=True)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        columns = ",\n".join(
+            f"{field} {'REAL' if field in REAL_COLUMNS else 'INTEGER' if field in AGE_RANGE_COLUMNS else 'TEXT'}"
+            for field in RESULT_FIELDS
+        )
+        with self.conn:
+            self.conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS providers (
+                    record_key TEXT PRIMARY KEY,
+                    {columns},
+                    age_mask INTEGER NOT NULL DEFAULT 0,
+                    loaded_at REAL NOT NULL
+                )
+                """
+            )
+            for column in INDEXED_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_providers_{column.lower()} ON providers ({column})")
+
+            # Full-text index over PROGRAM_NAME, kept in sync with the providers table by triggers
+            self.conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS providers_fts
+                USING fts5(PROGRAM_NAME, content='providers', content_rowid='rowid')
+                """
+            )
+            self.conn.executescript(
+                """
+                CREATE TRIGGER IF NOT EXISTS providers_fts_insert AFTER INSERT ON providers BEGIN
+                    INSERT INTO providers_fts (rowid, PROGRAM_NAME) VALUES (new.rowid, new.PROGRAM_NAME);
+                END;
+                CREATE TRIGGER IF NOT EXISTS providers_fts_delete AFTER DELETE ON providers BEGIN
+                    INSERT INTO providers_fts (providers_fts, rowid, PROGRAM_NAME)
+                    VALUES ('delete', old.rowid, old.PROGRAM_NAME);
+                END;
+                CREATE TRIGGER IF NOT EXISTS providers_fts_update AFTER UPDATE OF PROGRAM_NAME ON providers BEGIN
+                    INSERT INTO providers_fts (providers_fts, rowid, PROGRAM_NAME)
+                    VALUES ('delete', old.rowid, old.PROGRAM_NAME);
+                    INSERT INTO providers_fts (rowid, PROGRAM_NAME) VALUES (new.rowid, new.PROGRAM_NAME);
+                END;
+                """
+            )
+
+    def load_records(self, records, batch_size: int = 5000) -> float:
+        """
+        Insert or update records in bulk.
+
+        Args:
+            records (iterable): Records in the result CSV schema (dicts, e.g. CSV rows).
+            batch_size (int): Number of records written per statement batch.
+
+        Returns:
+            float: The load timestamp, which can be passed to `prune` to drop providers
+                missing from this run.
+        """
+        loaded_at = time.time()
+        fields = (*RESULT_FIELDS, "age_mask", "loaded_at")
+
+        # A row from an earlier load is replaced; rows of the same load are merged
+        same_load = "providers.loaded_at = excluded.loaded_at"
+        merged = {
+            column: f"CASE WHEN {same_load} THEN MAX(providers.{column}, excluded.{column}) ELSE excluded.{column} END"
+            for column in AGE_RANGE_COLUMNS
+        }
+        merged["age_mask"] = f"CASE WHEN {same_load} THEN providers.age_mask | excluded.age_mask ELSE excluded.age_mask END"
+        merged["AGE_RANGE"] = f"age_range_string({merged['age_mask']})"
+        merged["AGE_INFANT_MINIMUM"] = (
+            f"CASE WHEN {same_load} THEN COALESCE(NULLIF(excluded.AGE_INFANT_MINIMUM, ''), providers.AGE_INFANT_MINIMUM) "
+            "ELSE excluded.AGE_INFANT_MINIMUM END"
+        )
+        updates = ", ".join(f"{field} = {merged.get(field, f'excluded.{field}')}" for field in fields)
+        statement = (
+            f"INSERT INTO providers (record_key, {', '.join(fields)}) "
+            f"VALUES ({', '.join('?' * (len(fields) + 1))}) "
+            f"ON CONFLICT (record_key) DO UPDATE SET {updates}"
+        )
+
+        # AGE_RANGE and the flag columns are always derived from the mask, as they are on merge
+        def to_row(record: dict) -> tuple:
+            age_mask = age_mask_from_dict(record)
+            values = [record_key(record)]
+            for field in RESULT_FIELDS:
+                if field == "AGE_RANGE":
+                    value = AGE_RANGE_STRINGS[age_mask]
+                elif field in AGE_RANGE_COLUMNS:
+                    value = int(bool(age_mask & AGE_RANGE_BITS[field]))
+                else:
+                    value = record.get(field)
+                    if field in REAL_COLUMNS:
+                        value = float(value) if value not in (None, "") else None
+                values.append(value)
+            values.extend((age_mask, loaded_at))
+            return tuple(values)
+
+        count = 0
+        batch = []
+        with self.conn:
+            for record in records:
+                batch.append(to_row(record))
+                if len(batch) >= batch_size:
+                    self.conn.executemany(statement, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.conn.executemany(statement, batch)
+                count += len(batch)
+
+        # Refresh planner statistics so lookups pick the most selective index
+        self.conn.execute("PRAGMA optimize")
+
+        providers = self.conn.execute("SELECT COUNT(*) FROM providers WHERE loaded_at = ?", (loaded_at,)).fetchone()[0]
+        logging.info(f"Loaded {count} records into the store as {providers} providers.")
+        return loaded_at
+
+    def load_csv(self, csv_path: str) -> float:
+        """
+        Insert or update every record in a result CSV (e.g. results_final.csv).
+
+        Args:
+            csv_path (str): Path to the CSV file.
+
+        Returns:
+            float: The load timestamp, as returned by `load_records`.
+        """
+        with open(csv_path, "r", newline="", encoding="utf-8") as csv_file:
+            return self.load_records(csv.DictReader(csv_file))
+
+    def prune(self, loaded_at: float) -> int:
+        """
+        Delete providers that were not part of the load at `loaded_at`.
+
+        Args:
+            loaded_at (float): The timestamp returned by `load_records` or `load_csv`.
+
+        Returns:
+            int: The number of deleted providers.
+        """
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM providers WHERE loaded_at < ?", (loaded_at,))
+        logging.info(f"Pruned {cursor.rowcount} providers missing from the latest run.")
+        return cursor.rowcount
+
+    def find(self, zip_code: str = None, borough: str = None, program_setting: str = None,
+             age_mask: int = 0, limit: int = None) -> list:
+        """
+        Look up providers by indexed attributes. All given filters must match.
+
+        Args:
+            zip_code (str): Exact ADDRESS_ZIPCODE.
+            borough (str): Exact ADDRESS_BOUROUGH.
+            program_setting (str): Exact GEN_PROGRAM_SETTING.
+            age_mask (int): AGE_RANGE_* bits from common.records that must all be served.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: Matching records as dicts in the result CSV schema.
+        """
+        clauses = []
+        params = []
+        for column, value in (
+            ("ADDRESS_ZIPCODE", zip_code),
+            ("ADDRESS_BOUROUGH", borough),
+            ("GEN_PROGRAM_SETTING", program_setting),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        # Equality on each flag column lets SQLite use the per-flag indexes
+        for column in AGE_RANGE_COLUMNS:
+            if age_mask & AGE_RANGE_BITS[column]:
+                clauses.append(f"{column} = 1")
+
+        query = f"SELECT {', '.join(RESULT_FIELDS)} FROM providers"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return [row_to_record(row) for row in self.conn.execute(query, params)]
+
+    def search(self, text: str, limit: int = 50) -> list:
+        """
+        Full-text search over PROGRAM_NAME, best matches first.
+
+        Args:
+            text (str): Words that must all appear in the name, e.g. 'ymca' or "little stars".
+                Punctuation and FTS5 operators are matched as plain text.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: Matching records as dicts in the result CSV schema.
+        """
+        query_text = search_query(text)
+        if not query_text:
+            return []
+
+        columns = ", ".join(f"providers.{field}" for field in RESULT_FIELDS)
+        query = (
+            f"SELECT {columns} FROM providers_fts "
+            "JOIN providers ON providers.rowid = providers_fts.rowid "
+            "WHERE providers_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        return [row_to_record(row) for row in self.conn.execute(query, (query_text, limit))]
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+
+def main():
+    """
+    Load a result CSV into the serving store from the command line.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Load provider results into the indexed SQLite store.")
+    parser.add_argument("csv_path", help="Result CSV to load, e.g. results_final.csv.")
+    parser.add_argument("db_path", help="SQLite database to create or update, e.g. results_final.db.")
+    parser.add_argument("--prune", action="store_true", help="Delete providers that are not in this CSV.")
+    args = parser.parse_args()
+
+    store = ProviderStore(args.db_path)
+    try:
+        loaded_at = store.load_csv(args.csv_path)
+        if args.prune:
+            store.prune(loaded_at)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import csv
+import json
+import logging
+import os
+import re
+from common.records import FIELD_ATTRIBUTES, row_builder
+
+# Bounding box around the five boroughs: (min lat, max lat, min lon, max lon)
+NYC_BOUNDS = (40.4774, 40.9176, -74.2591, -73.7004)
+
+ZIP_TO_COUNTY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nyc_zip_to_county.json")
+
+ZIP_PATTERN = re.compile(r"\d{5}(?:-\d{4})?")
+NON_DIGITS = re.compile(r"\D")
+
+
+def load_zip_to_county(path: str = ZIP_TO_COUNTY_PATH) -> dict:
+    """
+    Load the NYC zip code to county mapping.
+
+    Args:
+        path (str): Path to the JSON mapping.
+
+    Returns:
+        dict: County names keyed by 5-digit zip code.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def to_float(value) -> float:
+    """
+    Convert a CSV or native value to a float without raising.
+
+    Args:
+        value: The value to convert.
+
+    Returns:
+        float: The converted value, or None if it is missing or not numeric.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_coordinates(latitudes: list, longitudes: list) -> list:
+    """
+    Check that every coordinate pair is present and inside the NYC bounding box.
+
+    Args:
+        latitudes (list): The ADDRESS_LATITUDE column.
+        longitudes (list): The ADDRESS_LONGITUDE column.
+
+    Returns:
+        list: A failure reason per row, or None where the row passes.
+    """
+    min_lat, max_lat, min_lon, max_lon = NYC_BOUNDS
+    results = []
+    for lat, lon in zip(map(to_float, latitudes), map(to_float, longitudes)):
+        if lat is None or lon is None:
+            results.append("missing or non-numeric coordinates")
+        elif not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            results.append("coordinates outside NYC")
+        else:
+            results.append(None)
+    return results
+
+
+def check_zip_codes(zip_codes: list, zip_to_county: dict) -> list:
+    """
+    Check that every zip code is a 5-digit (or ZIP+4) code within NYC.
+
+    Args:
+        zip_codes (list): The ADDRESS_ZIPCODE column.
+        zip_to_county (dict): The NYC zip code to county mapping.
+
+    Returns:
+        list: A failure reason per row, or None where the row passes.
+    """
+    results = []
+    for zip_code in zip_codes:
+        zip_code = str(zip_code or "").strip()
+        if not ZIP_PATTERN.fullmatch(zip_code):
+            results.append("invalid zip code")
+        elif zip_code[:5] not in zip_to_county:
+            results.append("zip code not in NYC")
+        else:
+            results.append(None)
+    return results
+
+
+def check_phones(phones: list) -> list:
+    """
+    Check that every phone number contains exactly 10 digits.
+
+    Args:
+        phones (list): The GEN_PHONE_1 column.
+
+    Returns:
+        list: A failure reason per row, or None where the row passes.
+    """
+    return [
+        None if len(NON_DIGITS.sub("", str(phone or ""))) == 10 else "phone number must have 10 digits"
+        for phone in phones
+    ]
+
+
+def validate_batch(records: list, zip_to_county: dict) -> tuple:
+    """
+    Validate a batch of records column by column.
+
+    AGE_RANGE and the AGE_RANGE_* flags are not checked: both are written from the
+    record's age mask, so they always agree.
+
+    Args:
+        records (list): ProviderRecord objects.
+        zip_to_county (dict): The NYC zip code to county mapping.
+
+    Returns:
+        tuple: (valid, rejects) where valid is a list of passing records and rejects is a
+            list of (record, reasons) pairs.
+    """
+    checks = [
+        check_coordinates(
+            [record.latitude for record in records],
+            [record.longitude for record in records],
+        ),
+        check_zip_codes([record.address_zipcode for record in records], zip_to_county),
+        check_phones([record.phone for record in records]),
+    ]
+
+    valid = []
+    rejects = []
+    for record, reasons in zip(records, zip(*checks)):
+        reasons = [reason for reason in reasons if reason]
+        if reasons:
+            rejects.append((record, reasons))
+        else:
+            valid.append(record)
+
+    return valid, rejects
+
+
+class ValidationStage:
+    """
+    Validate a stream of ProviderRecords in batches, writing failing rows to a rejects CSV.
+
+    The rejects file has the given fields plus a REJECT_REASONS column listing every
+    check the row failed, separated by '; '.
+    """
+
+    def __init__(self, rejects_path: str, fields: tuple, zip_to_county: dict = None, batch_size: int = 5000):
+        """
+        Open the rejects file.
+
+        Args:
+            rejects_path (str): Path of the rejects CSV to write.
+            fields (tuple): The record columns to write to the rejects CSV.
+            zip_to_county (dict): The NYC zip code to county mapping; loaded from disk if omitted.
+            batch_size (int): Number of records validated together.
+        """
+        if os.path.dirname(rejects_path):
+            os.makedirs(os.path.dirname(rejects_path), exist_ok=True)
+
+        self.rejects_path = rejects_path
+        self.zip_to_county = zip_to_county if zip_to_county is not None else load_zip_to_county()
+        self.batch_size = batch_size
+        self.valid_count = 0
+        self.reject_count = 0
+        self.fields = tuple(fields)
+        self.to_row = row_builder(fields)
+
+        self.rejects_file = open(rejects_path, "w", newline="", encoding="utf-8")
+        self.rejects_writer = csv.writer(self.rejects_file)
+        self.rejects_writer.writerow([*fields, "REJECT_REASONS"])
+
+    def process(self, records):
+        """
+        Validate records and yield the ones that pass.
+
+        Args:
+            records (iterable): ProviderRecord objects.
+
+        Yields:
+            ProviderRecord: Each record that passed every check, in input order.
+        """
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield from self._validate(batch)
+                batch = []
+        if batch:
+            yield from self._validate(batch)
+
+    def _validate(self, batch: list) -> list:
+        valid, rejects = validate_batch(batch, self.zip_to_county)
+        self.rejects_writer.writerows([*self._reject_row(record), "; ".join(reasons)] for record, reasons in rejects)
+        self.valid_count += len(valid)
+        self.reject_count += len(rejects)
+        return valid
+
+    def _reject_row(self, record) -> list:
+        # A reject must be written even if its age mask cannot be expanded into flags
+        try:
+            return self.to_row(record)
+        except (IndexError, TypeError):
+            return [
+                getattr(record, FIELD_ATTRIBUTES[field]) if field in FIELD_ATTRIBUTES
+                else record.age_mask if field == "AGE_RANGE" else ""
+                for field in self.fields
+            ]
+
+    def close(self):
+        """
+        Close the rejects file and log a summary.
+        """
+        self.rejects_file.close()
+        logging.info(
+            f"Validation passed {self.valid_count} records and rejected {self.reject_count} "
+            f"(see '{self.rejects_path}')."
+        )